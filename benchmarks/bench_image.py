@@ -0,0 +1,104 @@
+#!/usr/bin/python
+#
+# Time loading, enhancing and downconverting cover art against the
+# original implementations, and picking its dominant color.
+#
+# Usage: python -m benchmarks.bench_image [SIZE]
+#
+
+import io
+import sys
+import time
+
+from PIL import Image, ImageDraw, ImageEnhance
+
+from tuatara.image_utils import (
+    _enhance,
+    dominant_color,
+    downconvert,
+    get_palette,
+    image_from_buffer,
+)
+from tuatara.settings import settings
+
+
+def reference_load(buffer):
+    image = Image.open(io.BytesIO(buffer))
+    image.load()
+    return reference_enhance(image)
+
+
+def reference_enhance(image):
+    image = image.convert("RGB")
+    image = ImageEnhance.Brightness(image).enhance(settings.art.get("brightness_adj"))
+    image = ImageEnhance.Contrast(image).enhance(settings.art.get("contrast_adj"))
+    return image
+
+
+def reference_downconvert(image, width, height, colors):
+    palette = get_palette(colors)
+    if colors == 16:
+        dither = Image.Dither.FLOYDSTEINBERG
+    else:
+        dither = Image.Dither.NONE
+    if palette:
+        image = image.quantize(colors, palette=palette, dither=dither).convert("RGB")
+    image = image.resize((width, height))
+    if palette:
+        image = image.quantize(colors, palette=palette, dither=dither).convert("RGB")
+    return image
+
+
+def timed(label, func, runs):
+    start = time.perf_counter()
+    for i in range(runs):
+        output = func()
+    elapsed = (time.perf_counter() - start) / runs
+    print(f"{label:>14}: {elapsed * 1000:7.2f} ms, {output.width}x{output.height}")
+    return output
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    # Album-art-like: a gradient with a few shapes
+    art = Image.linear_gradient("L").resize((size, size)).convert("RGB")
+    draw = ImageDraw.Draw(art)
+    draw.ellipse((size // 4, size // 8, size * 3 // 4, size * 7 // 8), "orange")
+    draw.rectangle((0, size * 3 // 4, size, size), (95, 0, 135))
+
+    runs = 5
+    print(f"{size}x{size} art, {runs} runs")
+    for format in ("JPEG", "PNG"):
+        buffer = io.BytesIO()
+        art.save(buffer, format=format)
+        data = buffer.getvalue()
+        timed(f"full {format}", lambda: reference_load(data), runs)
+        timed(f"reduced {format}", lambda: image_from_buffer(data), runs)
+
+    timed("enhance", lambda: reference_enhance(art), runs)
+    timed("fused enhance", lambda: _enhance(art), runs)
+
+    art = image_from_buffer(data)
+    for colors in (16, 256):
+        timed(
+            f"downconvert {colors}",
+            lambda: reference_downconvert(art, 200, 120, colors),
+            runs,
+        )
+        # A copy each time, so the last result is not simply reused
+        timed(
+            f"single {colors}",
+            lambda: downconvert(art.copy(), 200, 120, colors),
+            runs,
+        )
+
+    start = time.perf_counter()
+    for i in range(runs):
+        color = dominant_color(art)
+    elapsed = (time.perf_counter() - start) / runs
+    print(f"{'dominant':>14}: {elapsed * 1000:7.2f} ms, {color}")
+
+
+if __name__ == "__main__":
+    main()
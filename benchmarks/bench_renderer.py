@@ -0,0 +1,127 @@
+#!/usr/bin/python
+#
+# Compare the art renderer against the original per-cell loop.
+#
+# Usage: python -m benchmarks.bench_renderer [WIDTH HEIGHT]
+#
+
+import random
+import sys
+import time
+
+from functools import lru_cache
+from types import SimpleNamespace
+
+import blessed
+
+from PIL import Image, ImageDraw
+
+from tuatara.image_utils import downconvert
+from benchmarks.reference import reference_render
+from tuatara.renderer import ArtRenderer, ColorTable
+
+
+def timed(label, func, frames):
+    start = time.perf_counter()
+    for i in range(frames):
+        output = func()
+    elapsed = (time.perf_counter() - start) / frames
+    print(f"{label:>14}: {elapsed * 1000:7.2f} ms/frame, {len(output)} chars")
+    return output
+
+
+def main():
+    width, height = (int(x) for x in sys.argv[1:3]) if len(sys.argv) > 2 else (200, 60)
+    term = blessed.Terminal(kind="xterm-256color", force_styling=True)
+    box = SimpleNamespace(width=width, height=height, left=1, top=1)
+
+    @lru_cache(maxsize=256)
+    def colorfunc(rgb):
+        return term.on_color_rgb(*rgb)
+
+    # A vis-like frame: a few thousand distinct colors
+    rng = random.Random(0)
+    img = Image.new("RGB", (width, height))
+    img.putdata(
+        [
+            (rng.randrange(0, 256, 4), rng.randrange(0, 256, 8), 0)
+            for i in range(width * height)
+        ]
+    )
+
+    # Album-art-like: flat areas and a few shapes, in the 256-color palette
+    art = Image.new("RGB", (width, height), (18, 18, 18))
+    draw = ImageDraw.Draw(art)
+    draw.ellipse((width // 4, height // 8, width * 3 // 4, height * 7 // 8), "orange")
+    draw.rectangle((0, height * 3 // 4, width, height), (95, 0, 135))
+    draw.text((4, 4), "TUATARA", fill="white")
+    tall = downconvert(art, width, height * 2, 256)
+    art = downconvert(art, width, height, 256)
+
+    renderer = ArtRenderer(term)
+    frames = 20
+    print(f"{width}x{height} art box, {frames} frames")
+    for label, frame in (("vis", img), ("art", art)):
+
+        def repaint():
+            renderer.invalidate()
+            return renderer.render(frame, box, "", " ", colorfunc)
+
+        timed(
+            f"{label} original",
+            lambda: reference_render(term, frame, box, "", " ", colorfunc),
+            frames,
+        )
+        timed(f"{label} renderer", repaint, frames)
+
+    # Successive frames differing in about a tenth of their cells
+    changed = img.copy()
+    for i in range(width * height // 10):
+        changed.putpixel((rng.randrange(width), rng.randrange(height)), (255, 255, 255))
+    images = [img, changed]
+
+    def update():
+        images.reverse()
+        return renderer.render(images[0], box, "", " ", colorfunc)
+
+    renderer.invalidate()
+    update()
+    update()
+    timed("vis diffed", update, frames)
+
+    # Twice the art's rows: as twice the cells, or as half blocks
+    @lru_cache(maxsize=256)
+    def fgfunc(rgb):
+        return term.color_rgb(*rgb)
+
+    tall_box = SimpleNamespace(width=width, height=height * 2, left=1, top=1)
+
+    def cells():
+        renderer.invalidate()
+        return renderer.render(tall, tall_box, "", " ", colorfunc)
+
+    def half():
+        renderer.invalidate()
+        return renderer.render_half(tall, box, "", fgfunc, colorfunc)
+
+    timed("art 2x cells", cells, frames)
+    timed("art half", half, frames)
+
+    # Color escapes for a frame's worth of distinct colors, from a cold
+    # 256-entry LRU cache (as a vis frame with many colors sees it), and
+    # from the lookup table
+    data = img.tobytes()
+    pixels = list(set(zip(data[0::3], data[1::3], data[2::3])))
+
+    def cached():
+        colorfunc.cache_clear()
+        return "".join(map(colorfunc, pixels))
+
+    table = ColorTable(term, background=True)
+    print(f"{len(pixels)} distinct colors")
+    timed("lru escapes", cached, frames)
+    timed("table escapes", lambda: "".join(map(table, pixels)), frames)
+
+
+if __name__ == "__main__":
+    main()
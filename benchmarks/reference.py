@@ -0,0 +1,20 @@
+#
+# Original implementations that the optimized code is compared against,
+# by both the benchmarks and the tests.
+#
+
+
+def reference_render(term, img, box, colorstr, ramp, colorfunc):
+    # The original per-cell renderer
+    grayscale_img = img.convert("L")
+    output = ""
+    for h in range(box.height):
+        output += term.move_xy(box.left, box.top + h)
+        output += colorstr
+        for w in range(box.width):
+            brightness = grayscale_img.getpixel((w, h)) / 255
+            r, g, b = img.getpixel((w, h))[:3]
+            ascii_char = ramp[int(brightness * (len(ramp) - 1))]
+            output += colorfunc((r, g, b)) + ascii_char
+        output += term.normal
+    return output
@@ -0,0 +1,13 @@
+import pytest
+
+from tuatara.settings import settings
+
+
+@pytest.fixture
+def no_debug():
+    # Debug logging off, whatever an earlier test left it as; a debug
+    # file closed by another test cannot be written to
+    debug = settings.debug
+    settings.set_debug(False)
+    yield
+    settings.set_debug(debug)
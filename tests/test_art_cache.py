@@ -0,0 +1,228 @@
+import io
+import os
+import time
+
+import pytest
+
+from PIL import Image
+
+from tuatara.art_cache import INDEX_FILE, LOCK_FILE, PACK_FILE, ArtCache
+from tuatara.cover_art import FileCoverArt
+from tuatara.playlist_entry import PlaylistEntry
+from tuatara.settings import settings
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch, no_debug):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setitem(settings._settings["art"], "cache_size_limit", 0)
+    monkeypatch.setitem(settings._settings["art"], "cache_pack", False)
+    os.makedirs(os.path.join(tmp_path, "tuatara", "artwork"))
+    return ArtCache()
+
+
+def png(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def write_art(cache, name, data):
+    with open(cache.path_for(name), "wb") as f:
+        f.write(data)
+
+
+def test_scan_and_lookup(cache):
+    write_art(cache, "a-b.art", png("red"))
+    assert cache.contains("a-b.art")
+    assert not cache.contains("c-d.art")
+    assert os.path.exists(os.path.join(cache.directory, INDEX_FILE))
+
+    art = cache.lookup("a-b.art")
+    assert art.path == cache.path_for("a-b.art")
+    assert art.get_image().getpixel((0, 0)) != (0, 0, 0)
+
+    # Index is not re-read once loaded
+    write_art(cache, "c-d.art", png("blue"))
+    assert not cache.contains("c-d.art")
+
+
+def test_scan_empty(cache):
+    # An empty cache is indexed once, under the lock, not on every access
+    assert not cache.contains("a-b.art")
+    assert os.path.exists(os.path.join(cache.directory, INDEX_FILE))
+    assert os.path.exists(os.path.join(cache.directory, LOCK_FILE))
+    write_art(cache, "a-b.art", png("red"))
+    assert not cache.contains("a-b.art")
+
+
+def test_missing_loose_file(cache):
+    write_art(cache, "a-b.art", png("red"))
+    assert cache.contains("a-b.art")
+    os.unlink(cache.path_for("a-b.art"))
+    assert cache.lookup("a-b.art") is None
+    assert not cache.contains("a-b.art")
+
+
+def test_shared_index(cache):
+    # Two instances (or a --warm-art run) adding art do not lose each
+    # other's entries
+    other = ArtCache()
+    assert not cache.contains("a-b.art")
+    assert not other.contains("a-b.art")
+    write_art(cache, "a-b.art", png("red"))
+    cache.add("a-b.art")
+    write_art(other, "c-d.art", png("blue"))
+    other.add("c-d.art")
+
+    assert other.contains("a-b.art")
+    assert cache.contains("c-d.art")
+    assert ArtCache().contains("a-b.art")
+    assert ArtCache().contains("c-d.art")
+
+
+def test_shared_pack(cache):
+    settings._settings["art"]["cache_pack"] = True
+    other = ArtCache()
+    write_art(cache, "a-b.art", png("red"))
+    cache.add("a-b.art")
+    assert cache.lookup("a-b.art").kind == "packed"
+    write_art(other, "c-d.art", png("blue"))
+    other.add("c-d.art")
+    other.prune()
+
+    for instance in (cache, other):
+        assert instance.lookup("a-b.art").get_image().getpixel((0, 0))[0] > 128
+        assert instance.lookup("c-d.art").get_image().getpixel((0, 0))[2] > 128
+
+
+def test_lookup_does_not_save(cache):
+    write_art(cache, "a-b.art", png("red"))
+    cache.add("a-b.art")
+    added = cache.entries["a-b.art"]["used"]
+    index = os.path.join(cache.directory, INDEX_FILE)
+    saved = os.stat(index)
+    time.sleep(0.01)
+    cache.lookup("a-b.art")
+    assert os.stat(index) == saved
+    assert ArtCache().stats()["newest"] == added
+
+    cache.flush()
+    assert ArtCache().stats()["newest"] == cache.entries["a-b.art"]["used"] > added
+    saved = os.stat(index)
+    cache.flush()
+    assert os.stat(index) == saved
+
+
+def test_lru_eviction(cache):
+    settings._settings["art"]["cache_size_limit"] = 2
+    data = b"x" * (800 * 1024)
+    for name in ("old.art", "used.art"):
+        write_art(cache, name, data)
+        cache.add(name)
+        time.sleep(0.01)
+    cache.lookup("old.art")
+    write_art(cache, "new.art", data)
+    cache.add("new.art")
+
+    assert cache.contains("old.art")
+    assert cache.contains("new.art")
+    assert not cache.contains("used.art")
+    assert not os.path.exists(cache.path_for("used.art"))
+    assert cache.total_size() <= 2 * 1024 * 1024
+
+
+def test_packing(cache):
+    settings._settings["art"]["cache_pack"] = True
+    for name, color in (("a-b.art", "red"), ("c-d.art", "blue")):
+        write_art(cache, name, png(color))
+        cache.add(name)
+        assert not os.path.exists(cache.path_for(name))
+
+    art = cache.lookup("c-d.art")
+    assert art.kind == "packed"
+    assert art.get_image().getpixel((0, 0))[2] > 0
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["packed"] == 2
+    assert stats["pack_unused"] == 0
+
+    # Evicted entries leave holes until pruned
+    del cache.entries["a-b.art"]
+    assert cache.stats()["pack_unused"] == len(png("red"))
+    cache.prune()
+    assert cache.stats()["pack_unused"] == 0
+    assert os.path.getsize(os.path.join(cache.directory, PACK_FILE)) == len(png("blue"))
+    assert cache.lookup("c-d.art").get_image() is not None
+
+
+def test_eviction_compacts_pack(cache):
+    settings._settings["art"]["cache_pack"] = True
+    settings._settings["art"]["cache_size_limit"] = 1
+    limit = 1024 * 1024
+    pack = cache.path_for(PACK_FILE)
+    sizes = []
+    for n in range(12):
+        write_art(cache, f"{n}.art", bytes([n]) * (200 * 1024))
+        cache.add(f"{n}.art")
+        sizes.append(os.path.getsize(pack))
+        assert cache.total_size() <= limit
+        assert sizes[-1] <= limit * 1.25
+    assert any(y < x for x, y in zip(sizes, sizes[1:]))
+    assert cache.lookup("11.art").buffer == bytes([11]) * (200 * 1024)
+
+
+def test_prune_packs_loose_files(cache):
+    write_art(cache, "a-b.art", png("red"))
+    assert cache.contains("a-b.art")
+    settings._settings["art"]["cache_pack"] = True
+    cache.prune()
+    assert not os.path.exists(cache.path_for("a-b.art"))
+    assert cache.lookup("a-b.art").kind == "packed"
+
+
+def test_prune_everything_packed(cache):
+    settings._settings["art"]["cache_pack"] = True
+    write_art(cache, "a-b.art", png("red"))
+    cache.add("a-b.art")
+    settings._settings["art"]["cache_size_limit"] = 1
+    cache.entries["a-b.art"]["size"] = 2 * 1024 * 1024
+
+    assert cache.prune()[1] == (0, 0)
+    assert not os.path.exists(os.path.join(cache.directory, PACK_FILE))
+    # Nothing left to prune
+    assert cache.prune()[1] == (0, 0)
+
+
+def test_prune_empty_pack(cache):
+    with open(cache.path_for(PACK_FILE), "wb"):
+        pass
+    cache.prune()
+    assert not os.path.exists(os.path.join(cache.directory, PACK_FILE))
+
+
+class FakeFetcher:
+    def fetch(self, track):
+        return "https://example.com/art.png"
+
+    def download(self, url, dest):
+        with open(dest, "wb") as f:
+            f.write(png("red"))
+        return FileCoverArt(dest)
+
+
+def test_fetch_packed(cache):
+    settings._settings["art"]["cache_pack"] = True
+    entry = PlaylistEntry("/music/track.flac")
+    entry.artist = "A"
+    entry.album = "B"
+    found = []
+    entry.fetch_cover_art(
+        [("fake", FakeFetcher())], entry.cached_art_path(), lambda: found.append(1)
+    )
+    assert found
+    assert entry.fetch_status == "success"
+    assert not os.path.exists(entry.cached_art_path())
+    assert entry.cover_art.kind == "packed"
+    assert entry.cover_art.get_image().getpixel((0, 0))[0] > 128
@@ -0,0 +1,79 @@
+import os
+
+from unittest import mock
+
+import pytest
+
+from tuatara.art_warmer import Album, warm_album
+from tuatara.playlist_entry import PlaylistEntry
+
+
+pytestmark = pytest.mark.usefixtures("no_debug")
+
+
+def album(tmp_path, artist="Some Artist", name="Some Album"):
+    entry = PlaylistEntry(os.path.join(tmp_path, "music", "track.flac"))
+    entry.artist = artist
+    entry.album = name
+    os.makedirs(os.path.join(tmp_path, "music"), exist_ok=True)
+    return Album(entry)
+
+
+def test_warm_inline(tmp_path):
+    a = album(tmp_path)
+    a.inline_art = True
+    assert warm_album(a, []) == "inline"
+
+
+def test_warm_directory(tmp_path):
+    a = album(tmp_path)
+    with open(os.path.join(tmp_path, "music", "cover.jpg"), "w") as f:
+        f.close()
+    assert warm_album(a, []) == "directory"
+
+
+def test_warm_cached(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    a = album(tmp_path)
+    path = a.entry.cached_art_path()
+    os.makedirs(os.path.dirname(path))
+    with open(path, "w") as f:
+        f.close()
+    assert warm_album(a, []) == "cached"
+
+
+def test_warm_fetched(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    a = album(tmp_path)
+
+    def download(url, dest):
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with open(dest, "wb") as f:
+            f.write(b"x" * 100)
+        return "art"
+
+    fetcher = mock.Mock()
+    fetcher.fetch.return_value = "https://art.example/art.jpg"
+    fetcher.download.side_effect = download
+    assert warm_album(a, [("mock", fetcher)]) == "fetched"
+    assert a.size == 100
+    assert a.elapsed > 0
+
+
+def test_warm_missed(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    a = album(tmp_path)
+
+    fetcher = mock.Mock()
+    fetcher.fetch.return_value = None
+    assert warm_album(a, [("mock", fetcher)]) == "missed"
+    assert warm_album(a, []) == "missed"
+
+
+def test_warm_error(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    a = album(tmp_path)
+
+    fetcher = mock.Mock()
+    fetcher.fetch.side_effect = KeyError("results")
+    assert warm_album(a, [("mock", fetcher)]) == "missed"
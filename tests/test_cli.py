@@ -106,3 +106,18 @@ def test_version(capsys, monkeypatch):
 
     cap = capsys.readouterr()
     assert cap.out == f"tuatara {version}\n"
+
+
+def test_warm_art_args():
+    args = setup_config(["--warm-art", "dummy.flac", "other"])
+    assert args.warm_art is True
+    assert args.content == ["dummy.flac", "other"]
+
+
+def test_cache_args_without_path():
+    args = setup_config(["--cache-stats"])
+    assert args.cache_stats is True
+    assert args.content == []
+
+    args = setup_config(["--cache-prune"])
+    assert args.cache_prune is True
@@ -1,18 +1,31 @@
+import json
 import os
 import sys
 import time
 
+import pytest
 import urllib3
 from unittest import mock
 
-from tuatara.cover_art_fetcher import AppleArtFetcher, MusicBrainzArtFetcher
+from tuatara.cover_art_fetcher import (
+    AppleArtFetcher,
+    MusicBrainzArtFetcher,
+    RateLimiter,
+)
 from tuatara.playlist_entry import PlaylistEntry
+from tuatara.response_cache import CachedResponse, response_cache
 from tuatara.sanitize import sanitize_artist, sanitize_album
 from tuatara.settings import settings
 
 settings.set_debug(True)
 
 
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    # Keep cached search responses from leaking between tests
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+
 def entry(artist, album, tracks=None, path=None):
     p = PlaylistEntry(path or "foo.flac")
     p.artist = artist
@@ -60,6 +73,104 @@ def test_http_response_handling_musicbrainz(capsys):
         assert "failed with 403" in cap.err
 
 
+def test_cached_search_response(capsys):
+    with mock.patch("urllib3.PoolManager.request") as urllib3_request:
+        urllib3_request.return_value = urllib3.response.HTTPResponse(
+            status=200, body=b'{"resultCount": 0, "results": []}'
+        )
+        f = AppleArtFetcher()
+        settings._debugobj = sys.stderr
+
+        not_a_thing = entry("🐕➕🌈", "🐕➕🌈")
+        assert f.fetch(not_a_thing) is None
+        assert f.fetch(not_a_thing) is None
+        cap = capsys.readouterr()
+        assert urllib3_request.call_count == 1
+        assert "Using cached response" in cap.err
+
+
+def test_revalidated_search_response(capsys):
+    url = "https://example.com/search?term=wow"
+    response_cache.put(CachedResponse(url, {"results": []}, 0, 60, etag='"v1"'))
+    assert not response_cache.get(url).is_fresh()
+
+    with mock.patch("urllib3.PoolManager.request") as urllib3_request:
+        urllib3_request.return_value = urllib3.response.HTTPResponse(
+            status=304, body=b""
+        )
+        f = AppleArtFetcher()
+        settings._debugobj = sys.stderr
+
+        assert f.request_json(url, "Search") == {"results": []}
+        cap = capsys.readouterr()
+        assert urllib3_request.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+        assert "still valid" in cap.err
+        assert response_cache.get(url).is_fresh()
+
+
+def musicbrainz_responses(method, url, **kwargs):
+    HTTPResponse = urllib3.response.HTTPResponse
+    if "/ws/2/artist" in url:
+        return HTTPResponse(
+            status=200, body=b'{"count": 1, "artists": [{"id": "a-1"}]}'
+        )
+    if "/ws/2/release" in url:
+        return HTTPResponse(
+            status=200,
+            body=json.dumps(
+                {
+                    "count": 3,
+                    "releases": [
+                        {"score": 100, "id": "r-2"},
+                        {"score": 100, "id": "r-1"},
+                        {"score": 95, "id": "r-0"},
+                    ],
+                }
+            ).encode(),
+        )
+    if "/release/r-0/" in url:
+        return HTTPResponse(status=404, body=b"")
+    mbid = url.split("/")[-2]
+    return HTTPResponse(
+        status=307, body=b"", headers={"Location": f"https://art.example/{mbid}.jpg"}
+    )
+
+
+def test_musicbrainz_probe_order_and_artist_memo():
+    with mock.patch(
+        "urllib3.PoolManager.request", side_effect=musicbrainz_responses
+    ) as urllib3_request:
+        f = MusicBrainzArtFetcher()
+        f.rate_limits = {}
+        settings._debugobj = sys.stderr
+
+        # r-0 has no art; of the rest, r-1 sorts first
+        result = f.fetch(entry("Some Artist", "First Album"))
+        assert result == "https://art.example/r-1.jpg"
+
+        result = f.fetch(entry("Some Artist", "Second Album"))
+        assert result == "https://art.example/r-1.jpg"
+        artist_searches = [
+            c
+            for c in urllib3_request.call_args_list
+            if "/ws/2/artist" in c.kwargs["url"]
+        ]
+        assert len(artist_searches) == 1
+
+        # Resolved artist IDs persist across fetcher instances
+        f = MusicBrainzArtFetcher()
+        f.rate_limits = {}
+        assert f.find_artist_id("some artist") == "a-1"
+
+
+def test_rate_limiter():
+    limiter = RateLimiter(0.05)
+    start = time.monotonic()
+    for i in range(3):
+        limiter.wait()
+    assert time.monotonic() - start >= 0.1
+
+
 def test_download_failure(tmp_path, capsys):
     with mock.patch("tuatara.cover_art_fetcher.AppleArtFetcher.fetch") as fetch:
         fetch.return_value = "https://somewhere.over/the/rainbow"
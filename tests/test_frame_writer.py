@@ -0,0 +1,73 @@
+import os
+import struct
+
+from unittest import mock
+
+from tuatara.frame_writer import FrameWriter
+
+
+def test_single_write():
+    (r, w) = os.pipe()
+    writer = FrameWriter(w)
+    writer.fragment("\x1b[H")
+    writer.write("héllo")
+    with mock.patch("os.write", wraps=os.write) as write:
+        assert writer.flush() == 9
+    assert write.call_count == 1
+    assert os.read(r, 100) == "\x1b[Hhéllo".encode("utf-8")
+    os.close(r)
+    os.close(w)
+
+
+def test_buffer_reused():
+    writer = FrameWriter(None)
+    writer.write("x" * 100)
+    buffer = writer.buffer
+    with mock.patch("os.write", side_effect=lambda fd, data: len(data)):
+        writer.flush()
+        writer.write("y" * 10)
+        assert writer.flush() == 10
+    assert writer.buffer is buffer
+    assert len(buffer) == 100
+
+
+def test_fragments_encoded_once():
+    writer = FrameWriter(None)
+    writer.fragment("\x1b[0m")
+    data = writer.fragments["\x1b[0m"]
+    writer.fragment("\x1b[0m")
+    assert writer.fragments["\x1b[0m"] is data
+    assert bytes(writer.buffer[: writer.length]) == b"\x1b[0m\x1b[0m"
+
+
+def test_partial_writes():
+    written = []
+    blocked = []
+
+    def short_write(fd, data):
+        if len(written) == 1 and not blocked:
+            blocked.append(True)
+            raise BlockingIOError
+        written.append(bytes(data[:3]))
+        return len(written[-1])
+
+    writer = FrameWriter(5)
+    writer.write("abcdefgh")
+    with (
+        mock.patch("os.write", side_effect=short_write),
+        mock.patch("select.select") as select,
+    ):
+        writer.flush()
+    select.assert_called_once_with([], [5], [])
+    assert b"".join(written) == b"abcdefgh"
+
+
+def test_pending():
+    (r, w) = os.pipe()
+    writer = FrameWriter(w)
+    # Not a terminal
+    assert writer.pending() == 0
+    with mock.patch("fcntl.ioctl", return_value=struct.pack("i", 5000)):
+        assert writer.pending() == 5000
+    os.close(r)
+    os.close(w)
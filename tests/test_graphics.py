@@ -0,0 +1,144 @@
+import base64
+import io
+import re
+
+from types import SimpleNamespace
+
+from PIL import Image
+
+from tuatara.graphics import (
+    KittyGraphics,
+    SixelGraphics,
+    detect_protocol,
+    graphics_for,
+    sixel,
+)
+
+
+def box(width, height):
+    return SimpleNamespace(width=width, height=height)
+
+
+def test_kitty_transmits_once():
+    kitty = KittyGraphics()
+    art = object()
+    image = Image.new("RGB", (10, 10), (255, 0, 0))
+
+    assert not kitty.sent(art)
+    first = kitty.draw(art, box(4, 2), kitty.encode(image, box(4, 2), (2, 4)))
+    assert first.startswith("\x1b_Ga=t,f=100,i=1,q=2,m=0;")
+    (transmit, place) = first.split("\x1b\\")[:2]
+    png = base64.standard_b64decode(transmit.split(";", 1)[1])
+    sent = Image.open(io.BytesIO(png))
+    assert sent.size == (8, 8)
+    assert sent.getpixel((0, 0))[:3] == (255, 0, 0)
+    assert place == "\x1b_Ga=p,i=1,p=1,c=4,r=2,C=1,z=-1,q=2"
+
+    assert kitty.sent(art)
+    again = kitty.draw(art, box(4, 2), None)
+    assert again == "\x1b_Ga=p,i=1,p=1,c=4,r=2,C=1,z=-1,q=2\x1b\\"
+
+    assert kitty.forget(art) == "\x1b_Ga=d,d=I,i=1,q=2\x1b\\"
+    assert kitty.forget(art) == ""
+    assert kitty.clear() == "\x1b_Ga=d,d=a,q=2\x1b\\"
+
+
+def test_kitty_chunks():
+    kitty = KittyGraphics()
+    # Noise does not compress, so this takes several chunks
+    image = Image.frombytes("RGB", (64, 64), bytes(range(256)) * 48)
+    image = image.effect_spread(10)
+    output = kitty.transmit(7, kitty.encode(image, box(32, 16), (2, 4)))
+    escapes = output.split("\x1b\\")[:-1]
+    assert len(escapes) > 1
+    assert escapes[0].startswith("\x1b_Ga=t,f=100,i=7,q=2,m=1;")
+    assert all(x.startswith("\x1b_Gm=1;") for x in escapes[1:-1])
+    assert escapes[-1].startswith("\x1b_Gm=0;")
+    assert all(len(x.split(";", 1)[1]) <= 4096 for x in escapes)
+    payload = "".join([x.split(";", 1)[1] for x in escapes])
+    assert Image.open(io.BytesIO(base64.standard_b64decode(payload))).size == (64, 64)
+
+
+def test_sixel_stream():
+    image = Image.new("RGB", (5, 7), (0, 0, 255))
+    image.putpixel((0, 6), (255, 255, 255))
+    # Two color registers; a first band of six rows of blue, then a
+    # second band of one row, blue after white in the first column
+    assert sixel(image) == (
+        '\x1bPq"1;1;5;7#0;2;0;0;100#1;2;100;100;100#0!5~-#0?!4@$#1@!4?\x1b\\'
+    )
+
+
+def test_sixel_exact():
+    image = Image.new("RGB", (4, 1), (255, 0, 0))
+    assert sixel(image) == '\x1bPq"1;1;4;1#0;2;100;0;0#0!4@\x1b\\'
+
+
+def test_sixel_noise():
+    # Each pixel is set in exactly one plane, that of its color
+    image = Image.frombytes("RGB", (16, 16), bytes(range(256)) * 3)
+    data = image.quantize(256, method=Image.Quantize.FASTOCTREE).tobytes()
+    output = sixel(image)
+    header = '\x1bPq"1;1;16;16'
+    assert output.startswith(header) and output.endswith("\x1b\\")
+    body = re.sub(r"#\d+;2;\d+;\d+;\d+", "", output[len(header) : -2])
+    bands = body.split("-")
+    assert len(bands) == 3
+    seen = [0] * 256
+    for top, band in zip(range(0, 16, 6), bands):
+        for plane in band.split("$"):
+            (color, sixels) = re.fullmatch(r"#(\d+)(.*)", plane).groups()
+            sixels = re.sub(r"!(\d+)(.)", lambda m: m[2] * int(m[1]), sixels)
+            assert len(sixels) == 16
+            for x, char in enumerate(sixels):
+                for dy in range(6):
+                    if (ord(char) - 63) & (1 << dy):
+                        assert data[(top + dy) * 16 + x] == int(color)
+                        seen[(top + dy) * 16 + x] += 1
+    assert seen == [1] * 256
+
+
+def test_sixel_graphics():
+    sixels = SixelGraphics()
+    art = object()
+    image = Image.new("RGB", (2, 2), (0, 255, 0))
+    data = sixels.encode(image, box(1, 1), (2, 2))
+    assert data == sixel(image)
+    assert not sixels.sent(art)
+    assert sixels.draw(art, box(1, 1), data) is data
+    assert sixels.clear() == ""
+    assert sixels.forget(art) == ""
+
+
+def test_detect_protocol():
+    assert detect_protocol({"TERM": "xterm-kitty"}) == "kitty"
+    assert detect_protocol({"TERM": "xterm-256color", "KITTY_WINDOW_ID": "1"}) == (
+        "kitty"
+    )
+    assert detect_protocol({"TERM": "foot"}) == "sixel"
+    assert detect_protocol({"TERM": "xterm-256color", "TERM_PROGRAM": "WezTerm"}) == (
+        "sixel"
+    )
+    assert detect_protocol({"TERM": "xterm-kitty", "TMUX": "/tmp/tmux"}) == "cells"
+    assert detect_protocol({"TERM": "xterm-256color"}) == "cells"
+
+
+def test_graphics_for_auto(monkeypatch):
+    monkeypatch.delenv("TMUX", raising=False)
+    monkeypatch.delenv("KITTY_WINDOW_ID", raising=False)
+    monkeypatch.delenv("TERM_PROGRAM", raising=False)
+    monkeypatch.setenv("TERM", "xterm-kitty")
+    assert isinstance(graphics_for("auto"), KittyGraphics)
+    monkeypatch.setenv("TERM", "foot")
+    assert isinstance(graphics_for("auto"), SixelGraphics)
+    monkeypatch.setenv("TMUX", "/tmp/tmux")
+    assert graphics_for("auto") is None
+    monkeypatch.delenv("TMUX")
+    monkeypatch.setenv("TERM", "xterm-256color")
+    assert graphics_for("auto") is None
+
+
+def test_graphics_for():
+    assert isinstance(graphics_for("kitty"), KittyGraphics)
+    assert isinstance(graphics_for("sixel"), SixelGraphics)
+    assert graphics_for("cells") is None
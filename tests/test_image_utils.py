@@ -0,0 +1,145 @@
+import io
+
+import pytest
+
+from PIL import Image, ImageChops, ImageDraw, ImageEnhance
+
+from tuatara.image_utils import (
+    _enhance,
+    dominant_color,
+    downconvert,
+    get_palette,
+    image_from_buffer,
+    image_from_file,
+    image_from_frame,
+)
+from tuatara.settings import settings
+
+
+pytestmark = pytest.mark.usefixtures("no_debug")
+
+
+def test_frame_with_padded_rows():
+    # 3 pixels of RGB is 9 bytes, padded to 12 per row
+    rows = [bytes([10, 20, 30] * 3) + b"\0\0\0", bytes([40, 50, 60] * 3) + b"\0\0\0"]
+    img = image_from_frame(b"".join(rows), 3, 2)
+    assert img.size == (3, 2)
+    assert img.getpixel((2, 0)) == (10, 20, 30)
+    assert img.getpixel((0, 1)) == (40, 50, 60)
+
+
+def test_frame_unpadded():
+    data = bytes(range(4 * 2 * 3))
+    img = image_from_frame(data, 4, 2)
+    assert img.tobytes() == data
+
+
+def encoded(size, format):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (120, 60, 30)).save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def test_large_jpeg_decoded_reduced():
+    img = image_from_buffer(encoded((4200, 3000), "JPEG"))
+    assert img.size == (2100, 1500)
+    assert img.mode == "RGB"
+
+
+def test_large_png_reduced():
+    img = image_from_buffer(encoded((3100, 4200), "PNG"))
+    assert img.size == (1034, 1400)
+
+
+def test_small_art_kept_whole():
+    img = image_from_buffer(encoded((1500, 900), "JPEG"))
+    assert img.size == (1500, 900)
+
+
+@pytest.mark.parametrize(
+    "brightness,contrast", [(1.0, 1.0), (0.75, 1.25), (1.3, 1.6), (0.7, 0.8)]
+)
+def test_enhance_matches_imageenhance(brightness, contrast, monkeypatch):
+    monkeypatch.setitem(settings.art, "brightness_adj", brightness)
+    monkeypatch.setitem(settings.art, "contrast_adj", contrast)
+    art = Image.linear_gradient("L").resize((64, 64)).convert("RGB")
+    ImageDraw.Draw(art).ellipse((8, 8, 40, 56), "orange")
+    expected = ImageEnhance.Brightness(art).enhance(brightness)
+    expected = ImageEnhance.Contrast(expected).enhance(contrast)
+    # The mean gray level is worked out from the color channels, not
+    # from rounded gray pixels, which can shift strong contrast a little
+    diff = ImageChops.difference(_enhance(art), expected)
+    assert max(high for (low, high) in diff.getextrema()) <= 2
+
+
+def test_enhance_converts_to_rgb(monkeypatch):
+    monkeypatch.setitem(settings.art, "brightness_adj", 1.0)
+    monkeypatch.setitem(settings.art, "contrast_adj", 1.0)
+    img = _enhance(Image.new("L", (4, 4), 100))
+    assert img.mode == "RGB"
+    assert img.getpixel((0, 0)) == (100, 100, 100)
+
+
+def test_dominant_color_skips_white():
+    art = Image.new("RGB", (100, 100), (255, 255, 255))
+    ImageDraw.Draw(art).rectangle((0, 0, 99, 29), (200, 40, 40))
+    assert dominant_color(art) == (204, 34, 34)
+
+
+def test_dominant_color_avoids_black():
+    art = Image.new("RGB", (100, 100), (0, 0, 0))
+    ImageDraw.Draw(art).rectangle((0, 0, 99, 19), (40, 80, 200))
+    assert dominant_color(art) == (34, 85, 204)
+
+
+def test_dominant_color_mostly_black():
+    art = Image.new("RGB", (100, 100), (0, 0, 0))
+    ImageDraw.Draw(art).rectangle((0, 0, 99, 1), (40, 80, 200))
+    assert dominant_color(art) == (0, 0, 0)
+
+
+def test_dominant_color_single_candidate():
+    # Only one color left once white is thrown out
+    art = Image.new("RGB", (100, 100), (255, 255, 255))
+    ImageDraw.Draw(art).rectangle((0, 0, 99, 9), (10, 10, 10))
+    assert dominant_color(art) == (0, 0, 0)
+
+
+def test_dominant_color_edge_cases():
+    assert dominant_color(None) == (0, 0, 0)
+    assert dominant_color(Image.new("RGB", (100, 100), (255, 255, 255))) == (0, 0, 0)
+    assert dominant_color(Image.new("L", (1, 1), 128)) == (136, 136, 136)
+
+
+def test_dominant_color_ties():
+    art = Image.new("RGB", (64, 64), (40, 80, 200))
+    ImageDraw.Draw(art).rectangle((0, 0, 63, 31), (200, 40, 40))
+    flipped = art.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+    assert dominant_color(art) == dominant_color(flipped) == (204, 34, 34)
+
+
+@pytest.mark.parametrize("colors", [16, 256, 1 << 24])
+def test_downconvert_maps_to_palette(colors):
+    art = Image.linear_gradient("L").resize((400, 400)).convert("RGB")
+    ImageDraw.Draw(art).ellipse((40, 40, 300, 360), "orange")
+    img = downconvert(art, 40, 20, colors)
+    assert img.size == (40, 20)
+    assert img.mode == "RGB"
+    palette = get_palette(colors)
+    if palette:
+        allowed = set(zip(*[iter(palette.getpalette()[: colors * 3])] * 3))
+        assert {color for (count, color) in img.getcolors()} <= allowed
+
+
+def test_downconvert_reuses_last_result():
+    art = Image.new("RGB", (100, 100), (200, 40, 40))
+    img = downconvert(art, 10, 10, 256)
+    assert downconvert(art, 10, 10, 256) is img
+    assert downconvert(art, 12, 10, 256) is not img
+    assert downconvert(art.copy(), 12, 10, 256).size == (12, 10)
+
+
+def test_image_from_missing_file(tmp_path):
+    assert image_from_file(tmp_path / "cover.png") is None
+    (tmp_path / "cover.jpg").write_bytes(b"not an image")
+    assert image_from_file(tmp_path / "cover.jpg") is None
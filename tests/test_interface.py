@@ -0,0 +1,381 @@
+import io
+import signal
+
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import pytest
+
+from PIL import Image
+
+from gi.repository import GLib
+
+from tuatara.cover_art import InlineCoverArt
+from tuatara.graphics import KittyGraphics, SixelGraphics
+from tuatara.interface import Interface
+from tuatara.playlist_entry import PlaylistEntry
+from tuatara.settings import settings
+
+
+class FakePlayer:
+    def __init__(self):
+        self.playing = False
+        self.track = PlaylistEntry("/music/track.flac")
+        self.track.title = "Some Title"
+        self.track.artist = "Some Artist"
+        self.track.album = "Some Album"
+        self.track.fetch_status = "failed"
+        self.status_queries = 0
+        self.vis_size = None
+        self.frame = None
+        self.frames_pulled = 0
+        self.vis_enabled = False
+        self.vis_rate = None
+
+    def is_playing(self):
+        return self.playing
+
+    def get_status(self):
+        return "ready"
+
+    def get_current_track(self):
+        return self.track
+
+    def get_status_str(self):
+        self.status_queries += 1
+        return "0:00:01 / 0:03:00"
+
+    @contextmanager
+    def vis_frame(self, repeat=False):
+        self.frames_pulled += 1
+        yield self.frame
+
+    def set_vis_enabled(self, enabled):
+        self.vis_enabled = enabled
+
+    def uses_spectrum(self):
+        return False
+
+    def set_vis_size(self, width, height):
+        self.vis_size = (width, height)
+
+    def set_vis_rate(self, fps):
+        self.vis_rate = fps
+
+
+@pytest.fixture
+def player():
+    return FakePlayer()
+
+
+@pytest.fixture
+def interface(player, monkeypatch, no_debug):
+    # Not whatever the terminal running the tests supports
+    monkeypatch.setitem(settings._settings["art"], "image_protocol", "cells")
+    handler = signal.getsignal(signal.SIGINT)
+    interface = Interface()
+    interface.player = player
+    yield interface
+    signal.signal(signal.SIGINT, handler)
+
+
+def test_no_timers_while_paused(interface, player):
+    interface.update_timers()
+    assert interface.status_source is None
+
+    player.playing = True
+    interface.update_timers()
+    assert interface.status_source
+
+    player.playing = False
+    interface.player_changed("state")
+    assert interface.status_source is None
+
+
+def test_status_redraw_skips_text(interface, player, capfd):
+    interface.display_info()
+    out = capfd.readouterr().out
+    assert "Some Title" in out
+    assert "0:00:01" in out
+
+    interface.request_redraw("status")
+    interface.display_info()
+    out = capfd.readouterr().out
+    assert "0:00:01" in out
+    assert "Some Title" not in out
+    assert "Some Artist" not in out
+
+
+def test_nothing_dirty_draws_nothing(interface, player, capfd):
+    interface.display_info()
+    capfd.readouterr()
+    queries = player.status_queries
+
+    interface.display_info()
+    out = capfd.readouterr().out
+    assert "Some Title" not in out
+    assert player.status_queries == queries
+
+
+def test_tags_redraw_text(interface, player, capfd):
+    interface.display_info()
+    capfd.readouterr()
+
+    player.track.title = "Another Title"
+    interface.player_changed("tags")
+    interface.display_info()
+    assert "Another Title" in capfd.readouterr().out
+
+
+def test_vis_sized_to_art_box(interface, player):
+    interface.display_info()
+    assert player.vis_size == (interface.art_box.width, interface.art_box.height)
+
+
+def test_vis_frames_drawn_when_shown(interface, player, capfd):
+    player.frame = Image.new("RGB", (8, 4), (200, 0, 0))
+    interface.display_info()
+    interface.player_changed("vis")
+    assert "vis" not in interface.dirty
+    assert player.frames_pulled == 0
+
+    interface.toggle_vis()
+    assert player.vis_enabled
+    interface.display_info()
+    assert player.frames_pulled == 1
+    capfd.readouterr()
+
+    interface.player_changed("vis")
+    interface.display_info()
+    assert player.frames_pulled == 2
+    assert "Some Title" not in capfd.readouterr().out
+
+
+def test_vis_disabled_when_hidden(interface, player):
+    interface.toggle_vis()
+    assert player.vis_enabled
+    interface.toggle_vis()
+    assert not player.vis_enabled
+
+
+def png(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def idle_calls(monkeypatch):
+    # Calls queued for the main loop, which does not run in tests
+    calls = []
+    monkeypatch.setattr(GLib, "idle_add", lambda *args: calls.append(args))
+    return calls
+
+
+def test_art_loaded_on_worker(interface, player, monkeypatch, capfd):
+    calls = idle_calls(monkeypatch)
+    art = InlineCoverArt(png("red"))
+    assert not art.loaded
+    player.track.cover_art = art
+
+    # Text is drawn straight away, with a placeholder for the art
+    interface.display_info()
+    assert "Some Title" in capfd.readouterr().out
+    assert art in interface.art_loading
+    assert not interface.art_shown
+
+    interface.art_pool.shutdown(wait=True)
+    assert art.loaded
+    loaded = [x for x in calls if x[0] == interface.art_loaded]
+    (callback, cover_art, future) = loaded[-1]
+    assert cover_art is art
+
+    interface.art_loaded(cover_art, future)
+    assert "art" in interface.dirty
+    interface.display_info()
+    assert interface.art_shown
+    assert not interface.art_loading
+    assert "Some Title" in capfd.readouterr().out
+
+
+def loaded_art(color):
+    art = InlineCoverArt(png(color))
+    art.load()
+    return art
+
+
+def count_renders(interface, monkeypatch):
+    renders = []
+    render = interface.renderer.render
+
+    def counted(*args):
+        renders.append(args)
+        return render(*args)
+
+    monkeypatch.setattr(interface.renderer, "render", counted)
+    return renders
+
+
+def test_art_waits_for_resize_to_settle(interface, player, monkeypatch):
+    renders = count_renders(interface, monkeypatch)
+    player.track.cover_art = loaded_art("red")
+    interface.sigwinch_handler()
+    interface.sigwinch_handler()
+    interface.display_info()
+    assert not renders
+    assert not interface.art_shown
+    assert player.vis_size is None
+
+    interface.resize_settled()
+    interface.display_info()
+    assert len(renders) == 1
+    assert interface.art_shown
+    assert player.vis_size == interface.art_pixels
+
+
+def test_art_reused_for_same_geometry(interface, player, monkeypatch, capfd):
+    renders = count_renders(interface, monkeypatch)
+    art = player.track.cover_art = loaded_art("red")
+    interface.display_info()
+    capfd.readouterr()
+    assert len(renders) == 1
+
+    # Resizing back to a size already drawn needs no rendering at all,
+    # even before the size has settled
+    interface.sigwinch_handler()
+    interface.display_info()
+    assert interface.art_shown
+    interface.resize_settled()
+    interface.display_info()
+    assert len(renders) == 1
+    assert interface.art_renders[interface.art_key(art)] in capfd.readouterr().out
+
+    player.track = PlaylistEntry("/music/other.flac")
+    player.track.fetch_status = "failed"
+    player.track.cover_art = loaded_art("blue")
+    interface.display_info()
+    assert len(renders) == 2
+    assert len(interface.art_renders) == 1
+
+
+def test_image_encoded_on_worker(interface, player, monkeypatch, capfd):
+    calls = idle_calls(monkeypatch)
+    interface.graphics = SixelGraphics()
+    art = player.track.cover_art = loaded_art("red")
+
+    # A placeholder is drawn while the art is fitted and encoded
+    interface.display_info()
+    key = interface.image_key(art)
+    assert key in interface.art_loading
+    assert not interface.art_shown
+    assert "\x1bPq" not in capfd.readouterr().out
+
+    interface.art_pool.shutdown(wait=True)
+    encoded = [x for x in calls if x[0] == interface.art_encoded]
+    (callback, encoded_key, future) = encoded[-1]
+    assert encoded_key == key
+    interface.art_encoded(encoded_key, future)
+    assert "art" in interface.dirty
+    interface.display_info()
+    assert interface.art_shown
+    assert future.result() in capfd.readouterr().out
+
+    # Redrawn at the same size from the same encoding
+    interface.clear_display = True
+    interface.display_info()
+    assert interface.art_shown
+    assert future.result() in capfd.readouterr().out
+
+
+def test_replaced_art_forgotten(interface, player, capfd):
+    interface.graphics = KittyGraphics()
+    art = player.track.cover_art = loaded_art("red")
+    interface.display_info()
+    key = interface.image_key(art)
+    future = Future()
+    future.set_result(
+        interface.graphics.encode(
+            art.get_image(), interface.art_box, interface.cell_size
+        )
+    )
+    interface.art_encoded(key, future)
+    interface.display_info()
+    assert interface.graphics.sent(art)
+    capfd.readouterr()
+
+    # Inline art from the tags replaces it within the same track
+    inline = player.track.cover_art = loaded_art("blue")
+    interface.player_changed("tags")
+    interface.display_info()
+    assert "\x1b_Ga=d,d=I,i=1,q=2\x1b\\" in capfd.readouterr().out
+    assert not interface.graphics.sent(art)
+    assert interface.image_key(inline) in interface.art_loading
+
+
+def test_text_layout_reused(interface, player, monkeypatch, capfd):
+    player.track.title = "A Title Much Too Long To Fit In The Info Panel " * 3
+    interface.display_info()
+    assert "…" in capfd.readouterr().out
+
+    measured = []
+    monkeypatch.setattr(
+        interface.term, "length", lambda text: measured.append(text) or len(text)
+    )
+    interface.hide_help()
+    interface.display_info()
+    assert "…" in capfd.readouterr().out
+    # Only the status line, which is not kept
+    assert measured == ["0:00:01 / 0:03:00"]
+
+    player.track.artist = "Another Artist"
+    interface.player_changed("tags")
+    interface.display_info()
+    assert "Another Artist" in capfd.readouterr().out
+    assert "Another Artist" in measured
+
+
+def test_status_line_not_kept(interface, player, monkeypatch, capfd):
+    interface.display_info()
+    layouts = dict(interface.layouts)
+    assert layouts
+
+    for second in range(2, 6):
+        monkeypatch.setattr(player, "get_status_str", lambda: f"0:00:0{second}")
+        interface.tick_status()
+        interface.display_info()
+        assert f"0:00:0{second}" in capfd.readouterr().out
+    assert interface.layouts == layouts
+
+
+def test_vis_throttled_when_terminal_lags(interface, player, capfd):
+    player.frame = Image.new("RGB", (8, 4), (200, 0, 0))
+    interface.toggle_vis()
+    interface.display_info()
+    assert "[LOW" not in capfd.readouterr().out
+
+    interface.write_time = 1.0
+    for x in range(3):
+        interface.adapt()
+    assert player.vis_rate == settings.art.get("vis_fps") // 2
+    assert "status" in interface.dirty
+    interface.player_changed("vis")
+    interface.display_info()
+    assert "0:00:01 / 0:03:00 [LOW RATE]" in capfd.readouterr().out
+
+
+def test_vis_drawn_at_lower_resolution(interface, player, monkeypatch, capfd):
+    renders = count_renders(interface, monkeypatch)
+    interface.term.number_of_colors = 1 << 24
+    interface.toggle_vis()
+    interface.throttle.level = 3
+    player.frame = Image.linear_gradient("L").convert("RGB")
+    interface.display_info()
+    assert "[LOW RESOLUTION]" in capfd.readouterr().out
+
+    # Each pixel drawn stands for a block of two by two
+    img = renders[-1][0]
+    (width, height) = img.size
+    assert img.size == interface.art_pixels
+    assert img.getpixel((0, 0)) == img.getpixel((1, 1))
+    assert img.getpixel((0, 0)) != img.getpixel((width - 2, height - 2))
+    for x in range(0, width - 1, 2):
+        assert img.getpixel((x, 1)) == img.getpixel((x + 1, 0))
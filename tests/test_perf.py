@@ -0,0 +1,50 @@
+from unittest import mock
+
+from tuatara.perf import PerfCounters
+
+
+def test_frame_totals():
+    perf = PerfCounters()
+    perf.current["encode"] = 0.002
+    perf.frame(1000)
+    perf.current["encode"] = 0.004
+    perf.frame(3000)
+    assert perf.frames == 2
+    assert perf.totals["encode"] == 0.006
+    assert perf.current["encode"] == 0.0
+    assert perf.bytes_total == 4000
+    assert "Encode: 3.00 ms/frame" in perf.summary()
+
+
+def test_measure():
+    perf = PerfCounters()
+    with mock.patch("time.perf_counter", side_effect=[1.0, 1.25]):
+        with perf.measure("write"):
+            pass
+    assert perf.current["write"] == 0.25
+
+
+def test_dropped_vis_frames():
+    perf = PerfCounters()
+    with mock.patch("time.monotonic", side_effect=[10.0, 10.1, 10.4, 20.0, 20.1]):
+        perf.vis_frame(0.1)
+        perf.vis_frame(0.1)
+        # Two frames late
+        perf.vis_frame(0.1)
+        perf.vis_stopped()
+        perf.vis_frame(0.1)
+        perf.vis_frame(0.1)
+    assert perf.vis_frames == 5
+    assert perf.vis_dropped == 2
+
+
+def test_key_latency():
+    perf = PerfCounters()
+    with mock.patch("time.perf_counter", side_effect=[5.0, 5.5]):
+        perf.key_pressed()
+        perf.key_handled()
+    assert list(perf.latencies) == [0.5]
+    perf.key_pressed()
+    perf.key_ignored()
+    perf.key_handled()
+    assert len(perf.latencies) == 1
@@ -0,0 +1,54 @@
+import pytest
+
+from tuatara.player import Player
+
+import gi
+
+gi.require_version("Gst", "1.0")
+from gi.repository import Gst  # noqa: E402
+
+
+def real_gstreamer(*elements):
+    # The visualization sink needs GStreamer itself, with these plugins
+    try:
+        Gst.init(None)
+        if not isinstance(Gst.version_string(), str):
+            return False
+    except Exception:
+        return False
+    return all([Gst.ElementFactory.find(x) for x in elements])
+
+
+@pytest.mark.skipif(
+    not real_gstreamer(
+        "videotestsrc", "videorate", "videoconvert", "videoscale", "appsink"
+    ),
+    reason="GStreamer video plugins not available",
+)
+def test_vis_sink_frame():
+    player = Player.__new__(Player)
+    player.spectrum = None
+    pipeline = Gst.Pipeline.new("test")
+    source = Gst.ElementFactory.make("videotestsrc")
+    source.set_property("num-buffers", 1)
+    sink = player.make_vis_sink()
+    pipeline.add(source)
+    pipeline.add(sink)
+    source.link(sink)
+    player.set_vis_size(8, 6)
+
+    pipeline.set_state(Gst.State.PLAYING)
+    message = pipeline.get_bus().timed_pop_filtered(
+        5 * Gst.SECOND, Gst.MessageType.EOS | Gst.MessageType.ERROR
+    )
+    try:
+        assert message and message.type == Gst.MessageType.EOS
+        with player.vis_frame() as image:
+            assert image.size == (8, 6)
+            assert image.mode == "RGB"
+        with player.vis_frame() as image:
+            assert image is None
+        with player.vis_frame(repeat=True) as image:
+            assert image.size == (8, 6)
+    finally:
+        pipeline.set_state(Gst.State.NULL)
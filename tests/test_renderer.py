@@ -0,0 +1,256 @@
+import random
+import re
+
+from types import SimpleNamespace
+
+import blessed
+
+from PIL import Image
+
+from benchmarks.reference import reference_render
+from tuatara.renderer import BLANK_RUN, RAMP, ArtRenderer, ColorTable
+
+ESCAPE = re.compile(r"\x1b\[([0-9;]*)([A-Za-z])|(.)", re.S)
+
+
+def emulate(output, cells=None):
+    # Just enough of a terminal to compare what ends up on screen
+    cells = {} if cells is None else cells
+    x = y = 0
+    fg = bg = None
+    for params, command, char in ESCAPE.findall(output):
+        if char:
+            cells[(x, y)] = (bg, char, fg if char != " " else None)
+            x += 1
+            continue
+        args = [int(a) for a in params.split(";")] if params else []
+        match command:
+            case "H":
+                y, x = args[0] - 1, args[1] - 1
+            case "C":
+                x += args[0]
+            case "X":
+                for i in range(args[0]):
+                    cells[(x + i, y)] = (bg, " ", None)
+            case "J":
+                cells.clear()
+            case "m":
+                if not args:
+                    fg = bg = None
+                while args:
+                    arg = args.pop(0)
+                    if arg in (38, 48):
+                        n = 4 if args.pop(0) == 2 else 1
+                        color = tuple(args[:n])
+                        args = args[n:]
+                        if arg == 38:
+                            fg = color
+                        else:
+                            bg = color
+                    elif arg == 0:
+                        fg = bg = None
+    return cells
+
+
+def random_image(width, height, mode="RGB", colors=None):
+    rng = random.Random(42)
+    palette = colors or [
+        tuple(rng.randrange(256) for i in range(len(mode))) for i in range(64)
+    ]
+    img = Image.new(mode, (width, height))
+    img.putdata([rng.choice(palette) for i in range(width * height)])
+    return img
+
+
+def terminal(colors):
+    term = blessed.Terminal(kind="xterm-256color", force_styling=True)
+    term.number_of_colors = colors
+    return term
+
+
+def test_block_render_matches_reference():
+    term = terminal(256)
+    box = SimpleNamespace(width=40, height=12, left=3, top=2)
+    img = random_image(box.width, box.height)
+
+    def colorfunc(rgb):
+        return term.on_color_rgb(*rgb)
+
+    renderer = ArtRenderer(term)
+    expected = reference_render(term, img, box, "\x1b[7m", " ", colorfunc)
+    output = renderer.render(img, box, "\x1b[7m", " ", colorfunc)
+    assert emulate(output) == emulate(expected)
+    # An unchanged frame writes nothing, until the screen is invalidated
+    assert renderer.render(img, box, "\x1b[7m", " ", colorfunc) == ""
+    assert renderer.frame_bytes == 0
+    renderer.invalidate()
+    assert renderer.render(img, box, "\x1b[7m", " ", colorfunc) == output
+    assert renderer.frame_bytes == len(output.encode())
+
+
+def test_ascii_render_matches_reference():
+    term = terminal(1 << 24)
+    box = SimpleNamespace(width=33, height=9, left=0, top=5)
+    img = random_image(box.width, box.height, mode="RGBA")
+
+    def colorfunc(rgb):
+        return term.color_rgb(*rgb)
+
+    renderer = ArtRenderer(term)
+    expected = reference_render(term, img, box, "", RAMP, colorfunc)
+    output = renderer.render(img, box, "", RAMP, colorfunc)
+    assert emulate(output) == emulate(expected)
+
+
+def test_colorfunc_change_resets_escapes():
+    term = terminal(1 << 24)
+    box = SimpleNamespace(width=2, height=1, left=0, top=0)
+    img = random_image(2, 1, colors=[(10, 20, 30)])
+    renderer = ArtRenderer(term)
+
+    def fg(rgb):
+        return term.color_rgb(*rgb)
+
+    def bg(rgb):
+        return term.on_color_rgb(*rgb)
+
+    assert "38;2;10;20;30" in renderer.render(img, box, "", " ", fg)
+    assert "48;2;10;20;30" in renderer.render(img, box, "", " ", bg)
+
+
+def test_damage_tracking():
+    term = terminal(1 << 24)
+    box = SimpleNamespace(width=20, height=3, left=2, top=1)
+    img = Image.new("RGB", (20, 3), (0, 0, 0))
+    renderer = ArtRenderer(term)
+
+    def bg(rgb):
+        return term.on_color_rgb(*rgb)
+
+    screen = emulate(renderer.render(img, box, "", " ", bg))
+    red = bg((255, 0, 0))
+    black = bg((0, 0, 0))
+
+    # Nearby changes share a run, distant ones get their own
+    for x in (3, 5, 15):
+        img.putpixel((x, 1), (255, 0, 0))
+    output = renderer.render(img, box, "", " ", bg)
+    expected = (
+        term.move_xy(5, 2)
+        + red
+        + " "
+        + black
+        + " "
+        + red
+        + " "
+        + term.normal
+        + term.move_xy(17, 2)
+        + red
+        + " "
+        + term.normal
+    )
+    assert output == expected
+    assert emulate(output, screen) == emulate(
+        reference_render(term, img, box, "", " ", bg)
+    )
+
+    # A different box always repaints in full
+    box.top = 2
+    output = renderer.render(img, box, "", " ", bg)
+    assert output.count(term.normal) == 3
+
+
+def test_run_length_colors():
+    term = terminal(256)
+    box = SimpleNamespace(width=30, height=2, left=0, top=0)
+    img = Image.new("RGB", (30, 2), (0, 0, 0))
+    for x in range(4):
+        img.putpixel((x, 0), (255, 0, 0))
+    renderer = ArtRenderer(term)
+
+    def bg(rgb):
+        return term.on_color_rgb(*rgb)
+
+    output = renderer.render(img, box, "", " ", bg)
+    assert emulate(output) == emulate(reference_render(term, img, box, "", " ", bg))
+    # One escape per color change, and long blank runs are erased
+    assert output.count(bg((255, 0, 0))) == 1
+    assert output.count(bg((0, 0, 0))) == 2
+    assert term.ech(26) + term.cuf(26) in output
+    assert term.ech(30) + term.cuf(30) in output
+    assert " " * BLANK_RUN not in output
+
+
+def test_colors_sharing_an_escape():
+    # In 256 colors, near colors map to the same escape
+    term = terminal(256)
+    box = SimpleNamespace(width=2, height=1, left=0, top=0)
+    img = Image.new("RGB", (2, 1), (0, 0, 0))
+    img.putpixel((1, 0), (1, 1, 1))
+    renderer = ArtRenderer(term)
+
+    def bg(rgb):
+        return term.on_color_rgb(*rgb)
+
+    assert bg((0, 0, 0)) == bg((1, 1, 1))
+    output = renderer.render(img, box, "", " ", bg)
+    assert output.count(bg((0, 0, 0))) == 1
+
+
+def test_half_block_render():
+    term = terminal(1 << 24)
+    box = SimpleNamespace(width=20, height=6, left=2, top=1)
+    img = random_image(box.width, box.height * 2, colors=[(200, 0, 0), (0, 0, 90)])
+
+    def fg(rgb):
+        return term.color_rgb(*rgb)
+
+    def bg(rgb):
+        return term.on_color_rgb(*rgb)
+
+    expected = ""
+    for h in range(box.height):
+        expected += term.move_xy(box.left, box.top + h)
+        for w in range(box.width):
+            top = img.getpixel((w, 2 * h))
+            bottom = img.getpixel((w, 2 * h + 1))
+            if top == bottom:
+                expected += bg(bottom) + " "
+            else:
+                expected += fg(top) + bg(bottom) + "▀"
+        expected += term.normal
+
+    renderer = ArtRenderer(term)
+    output = renderer.render_half(img, box, "", fg, bg)
+    assert emulate(output) == emulate(expected)
+    assert "▀" in output
+    # Same functions, same escape table: an unchanged frame writes nothing
+    assert renderer.render_half(img, box, "", fg, bg) == ""
+
+
+def test_color_table_256():
+    term = terminal(256)
+    fg = ColorTable(term)
+    bg = ColorTable(term, background=True)
+    # Colors from the 6x6x6 cube map to themselves
+    assert fg((95, 135, 175)) == term.color(67)
+    assert bg((95, 135, 175)) == term.on_color(67)
+    assert bg((0, 215, 95)) == term.on_color(41)
+    # Near colors share an escape object
+    assert bg((94, 134, 174)) is bg((97, 137, 177))
+
+
+def test_color_table_16():
+    term = terminal(16)
+    table = ColorTable(term, background=True)
+    assert table((250, 5, 5)) == term.on_color(9)
+    assert table((5, 5, 5)) == term.on_color(0)
+    assert table((250, 250, 250)) == term.on_color(15)
+
+
+def test_color_table_truecolor():
+    term = terminal(1 << 24)
+    assert ColorTable(term)((1, 2, 3)) == term.color_rgb(1, 2, 3)
+    assert ColorTable(term, background=True)((1, 2, 3, 255)) == term.on_color_rgb(
+        1, 2, 3
+    )
@@ -7,7 +7,14 @@ from decimal import Decimal
 
 import pytest
 
-from tuatara.settings import Settings, cache_dir, config_dir, debug, settings
+from tuatara.settings import (
+    Settings,
+    atomic_write,
+    cache_dir,
+    config_dir,
+    debug,
+    settings,
+)
 
 
 def test_sample_matches_defaults():
@@ -52,16 +59,28 @@ def test_validation(capsys):
         "brightness_adj": 10,
         "contrast_adj": True,
         "ascii_truecolor": "maybe",
+        "half_block": 2,
+        "image_protocol": "iterm",
         "visualization": 3.14159,
+        "vis_fps": 0,
+        "throttle": "auto",
+        "cache_size_limit": -5,
+        "cache_pack": "sometimes",
     }
     error_msgs = (
         "Error: 'fetchers' must be a list of fetchers. Set to [] to disable fetching\n",
         "Error: 'dynamic_background' must be true or false\n",
         "Error: 'ascii_truecolor' must be true or false\n",
+        "Error: 'half_block' must be true or false\n",
+        "Error: 'image_protocol' must be 'auto', 'kitty', 'sixel' or 'cells'\n",
         "Error: 'font_ratio' must be a positive number\n",
         "Error: 'brightness_adj' must be between 0 and 2\n",
         "Error: 'contrast_adj' must be between 0 and 2\n",
         "Error: 'visualization' must be a string\n",
+        "Error: 'vis_fps' must be a whole number from 1 to 60\n",
+        "Error: 'throttle' must be true or false\n",
+        "Error: 'cache_size_limit' must be a whole number of MiB\n",
+        "Error: 'cache_pack' must be true or false\n",
     )
 
     old_settings = defaults._settings
@@ -99,8 +118,14 @@ def test_override():
         "brightness_adj": 1.0,
         "contrast_adj": 1.99,
         "visualization": "goom",
+        "vis_fps": 60,
+        "throttle": False,
         "ascii_truecolor": True,
+        "half_block": True,
+        "image_protocol": "sixel",
         "dynamic_background": False,
+        "cache_size_limit": 0,
+        "cache_pack": True,
     }
 
     defaults.merge_art(good_data)
@@ -166,6 +191,7 @@ def test_cache_dir(monkeypatch):
     monkeypatch.delenv("XDG_CACHE_HOME")
     monkeypatch.setenv("HOME", "/myhomedir")
     assert cache_dir() == "/myhomedir/.cache/tuatara/artwork"
+    assert cache_dir("responses") == "/myhomedir/.cache/tuatara/responses"
 
 
 def test_config_dir(monkeypatch):
@@ -215,3 +241,19 @@ def test_bad_debugfile(capsys):
     cap = capsys.readouterr()
     assert settings._debugobj is None
     assert "Error: cannot open" in cap.err
+
+
+def test_atomic_write(tmp_path):
+    path = os.path.join(tmp_path, "sub", "data.json")
+    with atomic_write(path) as f:
+        f.write("{}")
+    with open(path) as f:
+        assert f.read() == "{}"
+
+    with pytest.raises(ValueError):
+        with atomic_write(path) as f:
+            f.write("partial")
+            raise ValueError
+    with open(path) as f:
+        assert f.read() == "{}"
+    assert os.listdir(os.path.dirname(path)) == ["data.json"]
@@ -0,0 +1,43 @@
+from tuatara.spectrum import (
+    THRESHOLD,
+    bar_colors,
+    bar_rows,
+    columns,
+    parse_magnitudes,
+)
+
+
+def test_parse_magnitudes():
+    text = (
+        "spectrum, endtime=(guint64)100000000, timestamp=(guint64)0, "
+        "magnitude=(float){ -70, -12.5, -3.0000001192092896 };"
+    )
+    assert parse_magnitudes(text) == [-70.0, -12.5, -3.0000001192092896]
+    assert parse_magnitudes("spectrum, endtime=(guint64)100000000;") is None
+
+
+def test_columns_cover_every_band():
+    magnitudes = [float(-x) for x in range(64)]
+    levels = columns(magnitudes, 16)
+    assert len(levels) == 16
+    # The loudest band is in the first column, the quietest in the last
+    assert levels[0] == 0.0
+    assert levels[-1] > THRESHOLD
+    assert levels == sorted(levels, reverse=True)
+
+
+def test_columns_pad_few_bands():
+    assert columns([-10.0, -20.0], 4) == [-10.0, -20.0, THRESHOLD, THRESHOLD]
+
+
+def test_bar_rows():
+    # Silent, full, and three eighths of the two-cell height
+    rows = bar_rows([THRESHOLD, 0, THRESHOLD * 13 / 16], 2)
+    assert rows == [" █ ", " █▃"]
+
+
+def test_bar_colors():
+    colors = bar_colors(3)
+    assert colors[0] == (255, 0, 0)
+    assert colors[1] == (255, 200, 0)
+    assert colors[2] == (0, 200, 0)
@@ -0,0 +1,78 @@
+from unittest import mock
+
+from tuatara.throttle import BACKED_UP_FRAMES, LEVELS, RECOVER_TIME, Throttle
+
+INTERVAL = 1 / 30
+
+
+def backed_up(throttle, frames=BACKED_UP_FRAMES):
+    return [throttle.update(INTERVAL, 0, INTERVAL) for x in range(frames)]
+
+
+def test_steps_down_when_writes_block():
+    throttle = Throttle()
+    assert throttle.name == "full"
+    assert backed_up(throttle) == [False] * (BACKED_UP_FRAMES - 1) + [True]
+    assert throttle.name == "low rate"
+    assert throttle.divisor == 2
+
+
+def test_steps_down_when_output_queued():
+    throttle = Throttle()
+    for x in range(BACKED_UP_FRAMES):
+        throttle.update(0.001, 100000, INTERVAL)
+    assert throttle.level == 1
+
+
+def test_occasional_slow_frame_ignored():
+    throttle = Throttle()
+    for x in range(10):
+        backed_up(throttle, BACKED_UP_FRAMES - 1)
+        throttle.update(0.001, 0, INTERVAL)
+    assert throttle.level == 0
+
+
+def test_lowest_level():
+    throttle = Throttle()
+    backed_up(throttle, BACKED_UP_FRAMES * 10)
+    assert throttle.level == len(LEVELS) - 1
+    assert (throttle.colors, throttle.scale) == (256, 2)
+
+
+def test_recovers():
+    now = 1000.0
+    with mock.patch("time.monotonic", side_effect=lambda: now):
+        throttle = Throttle()
+        backed_up(throttle, BACKED_UP_FRAMES * 2)
+        assert throttle.level == 2
+
+        now += RECOVER_TIME / 2
+        assert not throttle.update(0.001, 0, INTERVAL)
+        now += RECOVER_TIME / 2
+        assert throttle.update(0.001, 0, INTERVAL)
+        assert throttle.level == 1
+        assert not throttle.update(0.001, 0, INTERVAL)
+
+
+def test_256_color_terminal():
+    # Fewer colors would save nothing, so the "low color" level is skipped
+    now = 1000.0
+    with mock.patch("time.monotonic", side_effect=lambda: now):
+        throttle = Throttle(term_colors=256)
+        backed_up(throttle)
+        assert throttle.name == "low rate"
+        assert backed_up(throttle)[-1]
+        assert throttle.name == "low resolution"
+
+        now += RECOVER_TIME
+        assert throttle.update(0.001, 0, INTERVAL)
+        assert throttle.name == "low rate"
+        now += RECOVER_TIME
+        assert throttle.update(0.001, 0, INTERVAL)
+        assert throttle.level == 0
+
+
+def test_disabled():
+    throttle = Throttle(enabled=False)
+    backed_up(throttle, BACKED_UP_FRAMES * 10)
+    assert throttle.level == 0
@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+#
+# SPDX-FileCopyrightText: Copyright © 2023 Bill Nottingham <notting@splat.cc>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import fcntl
+import json
+import mmap
+import os
+import time
+
+from contextlib import contextmanager
+from threading import RLock
+
+from tuatara.cover_art import FileCoverArt, PackedCoverArt
+from tuatara.settings import atomic_write, cache_dir, debug, settings
+
+INDEX_FILE = "index.json"
+LOCK_FILE = "index.lock"
+PACK_FILE = "artwork.pack"
+
+# Share of cache_size_limit that evicted art may take up in the pack file
+# before it is compacted
+COMPACT_SHARE = 0.25
+
+
+class ArtCache:
+    # Index of the artwork cache directory. Each entry is either a loose
+    # `{artist}-{album}.art` file, or a slice of the pack file.
+    #
+    # The index is shared with other instances and --warm-art runs. It
+    # is read again whenever the file has been replaced, and changes are
+    # made under a file lock, on top of what is on disk at the time (see
+    # updating()). Entries record when they were last used, for LRU
+    # eviction; lookups only note that in memory, and it is saved with
+    # the next change, or by flush().
+    def __init__(self):
+        self.lock = RLock()
+        self.directory = None
+        self.index_id = None
+        self.entries = {}
+        self.used_changed = False
+        self.pack = None
+        self.pack_size = 0
+
+    def path_for(self, name):
+        return os.path.join(cache_dir(), name)
+
+    def index_path(self):
+        return os.path.join(self.directory, INDEX_FILE)
+
+    def identify_index(self):
+        # Saving replaces the file, so a new inode means a new index
+        try:
+            stat = os.stat(self.index_path())
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def load(self, scan=True):
+        # Without scan, a missing or unreadable index leaves index_id
+        # unset, for updating() to rebuild under the lock
+        directory = cache_dir()
+        if directory != self.directory:
+            self.close_pack()
+            self.directory = directory
+            self.index_id = None
+            self.entries = {}
+        index_id = self.identify_index()
+        if index_id is not None and index_id == self.index_id:
+            return
+        path = self.index_path()
+        try:
+            with open(path, "r") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            if self.index_id is None and scan and os.path.isdir(directory):
+                with self.updating():
+                    pass
+            return
+        except (OSError, ValueError):
+            self.entries = {}
+            self.index_id = None
+            if scan:
+                debug(f"Rebuilding unreadable art cache index {path}")
+                with self.updating():
+                    pass
+            return
+        # Another instance may have packed or compacted; keep only the
+        # last use times known here
+        for name, entry in entries.items():
+            if name in self.entries:
+                entry["used"] = max(entry["used"], self.entries[name]["used"])
+        self.close_pack()
+        self.entries = entries
+        self.index_id = index_id
+
+    @contextmanager
+    def updating(self):
+        # Make changes to the index, and save them, while holding a lock
+        # shared with other instances
+        with self.lock:
+            self.load(scan=False)
+            try:
+                os.makedirs(self.directory, mode=0o755, exist_ok=True)
+                lockfile = open(os.path.join(self.directory, LOCK_FILE), "a")
+            except OSError as e:
+                debug(f"Cannot lock art cache index: {e}")
+                lockfile = None
+            try:
+                if lockfile:
+                    fcntl.flock(lockfile, fcntl.LOCK_EX)
+                self.load(scan=False)
+                if self.index_id is None:
+                    self.scan()
+                yield
+                self.save()
+            finally:
+                if lockfile:
+                    lockfile.close()
+
+    def scan(self):
+        # No index (yet); adopt any loose art files. The index is saved
+        # even if there are none, so this is done once.
+        try:
+            direntries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return
+        for entry in direntries:
+            if entry.is_file() and entry.name.endswith(".art"):
+                stat = entry.stat()
+                self.entries[entry.name] = {
+                    "size": stat.st_size,
+                    "used": stat.st_mtime,
+                    "offset": None,
+                }
+        if self.entries:
+            debug(f"Indexed {len(self.entries)} cached art files")
+
+    def save(self):
+        try:
+            with atomic_write(self.index_path()) as f:
+                json.dump(self.entries, f)
+        except OSError as e:
+            debug(f"Cannot save art cache index: {e}")
+        self.index_id = self.identify_index()
+        self.used_changed = False
+
+    def flush(self):
+        with self.lock:
+            if self.used_changed:
+                with self.updating():
+                    pass
+
+    def open_pack(self):
+        if self.pack is None:
+            path = os.path.join(self.directory, PACK_FILE)
+            with open(path, "rb") as f:
+                self.pack = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.pack
+
+    def close_pack(self):
+        if self.pack is not None:
+            self.pack.close()
+            self.pack = None
+
+    def contains(self, name):
+        with self.lock:
+            self.load()
+            return name in self.entries
+
+    def size_of(self, name):
+        with self.lock:
+            self.load()
+            entry = self.entries.get(name)
+            return entry["size"] if entry else 0
+
+    def lookup(self, name):
+        with self.lock:
+            self.load()
+            entry = self.entries.get(name)
+            if not entry:
+                return None
+            if entry["offset"] is None:
+                path = self.path_for(name)
+                if not os.path.exists(path):
+                    debug(f"Cached art {path} has gone missing")
+                    with self.updating():
+                        self.entries.pop(name, None)
+                    return None
+                art = FileCoverArt(path)
+            else:
+                try:
+                    pack = self.open_pack()
+                except OSError as e:
+                    debug(f"Cannot read art cache pack: {e}")
+                    return None
+                offset = entry["offset"]
+                art = PackedCoverArt(name, pack[offset : offset + entry["size"]])
+            entry["used"] = time.time()
+            self.used_changed = True
+            return art
+
+    def add(self, name):
+        # Record a freshly downloaded loose file
+        with self.updating():
+            path = self.path_for(name)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                return
+            self.entries[name] = {"size": size, "used": time.time(), "offset": None}
+            if settings.art.get("cache_pack"):
+                self.pack_entries([name])
+            self.evict()
+
+    def limit(self):
+        return settings.art.get("cache_size_limit") * 1024 * 1024
+
+    def total_size(self):
+        return sum([x["size"] for x in self.entries.values()])
+
+    def evict(self):
+        # Evicted packed art stays in the pack file until it is compacted;
+        # that is done once it takes up a fair share of the limit, so the
+        # limit also bounds the pack's size
+        limit = self.limit()
+        if not limit:
+            return
+        total = self.total_size()
+        by_age = sorted(self.entries.items(), key=lambda x: x[1]["used"])
+        for name, entry in by_age:
+            if total <= limit:
+                break
+            debug(f"Evicting cached art {name}")
+            if entry["offset"] is None:
+                try:
+                    os.unlink(self.path_for(name))
+                except FileNotFoundError:
+                    pass
+            del self.entries[name]
+            total -= entry["size"]
+        if self.pack_unused() > limit * COMPACT_SHARE:
+            self.compact()
+
+    def pack_unused(self):
+        try:
+            pack_size = os.path.getsize(os.path.join(self.directory, PACK_FILE))
+        except OSError:
+            return 0
+        packed = [x for x in self.entries.values() if x["offset"] is not None]
+        return pack_size - sum([x["size"] for x in packed])
+
+    def pack_entries(self, names):
+        # Append loose files to the pack, then remove them
+        path = os.path.join(self.directory, PACK_FILE)
+        self.close_pack()
+        with open(path, "ab") as pack:
+            offset = pack.tell()
+            for name in names:
+                loose = self.path_for(name)
+                try:
+                    with open(loose, "rb") as f:
+                        data = f.read()
+                except OSError as e:
+                    debug(f"Cannot pack {loose}: {e}")
+                    continue
+                pack.write(data)
+                self.entries[name]["offset"] = offset
+                self.entries[name]["size"] = len(data)
+                offset += len(data)
+        # The index must point into the pack before the loose files go
+        self.save()
+        for name in names:
+            if self.entries[name]["offset"] is not None:
+                os.unlink(self.path_for(name))
+
+    def compact(self):
+        # Rewrite the pack with only live entries. A pack with nothing in
+        # it is removed, as an empty file cannot be mapped.
+        path = os.path.join(self.directory, PACK_FILE)
+        packed = [x for x in self.entries.items() if x[1]["offset"] is not None]
+        try:
+            pack_size = os.path.getsize(path)
+        except FileNotFoundError:
+            return
+        if not packed or not pack_size:
+            for name, entry in packed:
+                debug(f"Cached art {name} is missing from the empty pack")
+                del self.entries[name]
+            self.close_pack()
+            os.unlink(path)
+            return
+        old = self.open_pack()
+        offsets = {}
+        with atomic_write(path, "wb") as f:
+            for name, entry in packed:
+                offsets[name] = f.tell()
+                f.write(old[entry["offset"] : entry["offset"] + entry["size"]])
+        self.close_pack()
+        for name in offsets:
+            self.entries[name]["offset"] = offsets[name]
+
+    def prune(self):
+        with self.updating():
+            before = (len(self.entries), self.total_size())
+            for name, entry in list(self.entries.items()):
+                if entry["offset"] is None and not os.path.exists(self.path_for(name)):
+                    del self.entries[name]
+            self.evict()
+            if settings.art.get("cache_pack"):
+                loose = [x for x in self.entries if self.entries[x]["offset"] is None]
+                if loose:
+                    self.pack_entries(loose)
+            self.compact()
+            return before, (len(self.entries), self.total_size())
+
+    def stats(self):
+        with self.lock:
+            self.load()
+            packed = [x for x in self.entries.values() if x["offset"] is not None]
+            used = [x["used"] for x in self.entries.values()]
+            try:
+                pack_size = os.path.getsize(os.path.join(self.directory, PACK_FILE))
+            except OSError:
+                pack_size = 0
+            return {
+                "directory": self.directory,
+                "entries": len(self.entries),
+                "packed": len(packed),
+                "size": self.total_size(),
+                "pack_size": pack_size,
+                "pack_unused": self.pack_unused(),
+                "limit": self.limit(),
+                "oldest": min(used) if used else None,
+                "newest": max(used) if used else None,
+            }
+
+
+def print_stats():
+    def mib(size):
+        return f"{size / 1048576:.1f} MiB"
+
+    def when(timestamp):
+        if timestamp is None:
+            return "-"
+        return time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))
+
+    stats = art_cache.stats()
+    limit = mib(stats["limit"]) if stats["limit"] else "unlimited"
+    print(f"Art cache: {stats['directory']}")
+    print(f"Entries: {stats['entries']} ({stats['packed']} packed)")
+    print(f"Size: {mib(stats['size'])} of {limit}")
+    print(
+        f"Pack file: {mib(stats['pack_size'])}"
+        f" ({mib(stats['pack_unused'])} reclaimable)"
+    )
+    print(f"Least recently used: {when(stats['oldest'])}")
+    print(f"Most recently used: {when(stats['newest'])}")
+    return 0
+
+
+def prune():
+    (before, after) = art_cache.prune()
+    print(
+        f"Pruned art cache from {before[0]} entries ({before[1] / 1048576:.1f} MiB)"
+        f" to {after[0]} entries ({after[1] / 1048576:.1f} MiB)"
+    )
+    return 0
+
+
+art_cache = ArtCache()
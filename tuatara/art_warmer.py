@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+#
+# SPDX-FileCopyrightText: Copyright © 2023 Bill Nottingham <notting@splat.cc>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from tuatara.art_cache import art_cache
+from tuatara.playlist import create_playlist
+from tuatara.playlist_entry import configured_fetchers
+from tuatara.sanitize import sanitize_artist, sanitize_album
+from tuatara.settings import debug
+
+import gi
+
+gi.require_version("Gst", "1.0")
+gi.require_version("GstPbutils", "1.0")
+from gi.repository import GLib, Gst, GstPbutils  # noqa: E402
+
+# Albums fetched at once. The fetchers' own rate limits still apply.
+WARM_WORKERS = 4
+
+
+class Album:
+    def __init__(self, entry):
+        self.entry = entry
+        self.inline_art = False
+        self.outcome = None
+        self.size = 0
+        self.elapsed = 0.0
+
+
+def read_tags(discoverer, entry):
+    try:
+        info = discoverer.discover_uri(Gst.filename_to_uri(entry.url))
+    except GLib.Error as e:
+        debug(f"Cannot read tags from {entry.url}: {e.message}")
+        return False
+    tags = info.get_tags()
+    if not tags:
+        return False
+    (found, value) = tags.get_string(Gst.TAG_TITLE)
+    if found:
+        entry.title = value
+    (found, value) = tags.get_string(Gst.TAG_ARTIST)
+    if found:
+        entry.artist = value
+    (found, value) = tags.get_string(Gst.TAG_ALBUM)
+    if found:
+        entry.album = value
+    (found, value) = tags.get_uint(Gst.TAG_TRACK_COUNT)
+    if found:
+        entry.track_total = value
+    (found, sample) = tags.get_sample(Gst.TAG_IMAGE)
+    return found
+
+
+def group_albums(playlist):
+    discoverer = GstPbutils.Discoverer.new(10 * Gst.SECOND)
+    albums = {}
+    untagged = 0
+    for entry in playlist:
+        if not entry.is_local():
+            debug(f"Skipping remote {entry.url}")
+            continue
+        inline_art = read_tags(discoverer, entry)
+        if not entry.artist or not entry.album:
+            untagged += 1
+            continue
+        key = (sanitize_artist(entry.artist), sanitize_album(entry.album))
+        if key not in albums:
+            albums[key] = Album(entry)
+        albums[key].inline_art |= inline_art
+    return albums, untagged
+
+
+def warm_album(album, fetchers):
+    # One album going wrong (unreadable files, a fetcher choking on an
+    # unexpected reply) must not end the whole run
+    try:
+        return find_album_art(album, fetchers)
+    except Exception as e:
+        debug(f"Cannot warm art for {album.entry}: {e!r}")
+        return "missed"
+
+
+def find_album_art(album, fetchers):
+    entry = album.entry
+    if album.inline_art:
+        return "inline"
+    if entry.directory_art_path():
+        return "directory"
+    if art_cache.contains(entry.cache_name()):
+        return "cached"
+    if not fetchers:
+        return "missed"
+    start = time.monotonic()
+    entry.fetch_cover_art(fetchers, entry.cached_art_path())
+    album.elapsed = time.monotonic() - start
+    if entry.fetch_status != "success":
+        return "missed"
+    album.size = art_cache.size_of(entry.cache_name())
+    return "fetched"
+
+
+def report(albums, tracks, untagged, elapsed):
+    def count(outcome):
+        return len([x for x in albums if x.outcome == outcome])
+
+    fetched = [x for x in albums if x.outcome == "fetched"]
+    attempted = [x for x in albums if x.elapsed > 0]
+    size = sum([x.size for x in fetched])
+    print(
+        f"Scanned {tracks} tracks in {len(albums)} albums "
+        f"({untagged} untagged tracks skipped) in {elapsed:.1f}s"
+    )
+    print(
+        f"Art already available: {count('inline') + count('directory') + count('cached')}"
+        f" (inline {count('inline')}, directory {count('directory')},"
+        f" cached {count('cached')})"
+    )
+    print(
+        f"Fetched: {len(fetched)} ({size / 1048576:.1f} MiB), missed: {count('missed')}"
+    )
+    if attempted:
+        times = [x.elapsed for x in attempted]
+        print(
+            f"Fetch time: total {sum(times):.1f}s, "
+            f"average {sum(times) / len(times):.2f}s, slowest {max(times):.2f}s"
+        )
+
+
+def warm_art(paths):
+    start = time.monotonic()
+    playlist = create_playlist(paths)
+    if playlist == []:
+        print("Nothing to scan.")
+        return 1
+
+    Gst.init()
+    albums, untagged = group_albums(playlist)
+    albums = list(albums.values())
+    fetchers = configured_fetchers()
+
+    with ThreadPoolExecutor(max_workers=WARM_WORKERS) as pool:
+        outcomes = pool.map(lambda album: warm_album(album, fetchers), albums)
+        for album, outcome in zip(albums, outcomes):
+            album.outcome = outcome
+            debug(f"{outcome}: {album.entry.artist} - {album.entry.album}")
+
+    report(albums, len(playlist), untagged, time.monotonic() - start)
+    return 0
@@ -31,7 +31,7 @@ def setup_config(args=sys.argv[1:]):
         prog="tuatara", description="Text-mode music player"
     )
     parser.add_argument(
-        "content", metavar="PATH", type=str, nargs="+", help="What to play"
+        "content", metavar="PATH", type=str, nargs="*", help="What to play"
     )
     parser.add_argument(
         "-f",
@@ -45,8 +45,23 @@ def setup_config(args=sys.argv[1:]):
         "-d", "--debug", help="Log debugging information", action="store_true"
     )
     parser.add_argument("--debugfile", help="Debug log file name", action="store")
+    parser.add_argument(
+        "--warm-art",
+        help="Fetch and cache cover art for PATH without playing it",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--cache-stats", help="Show cover art cache statistics", action="store_true"
+    )
+    parser.add_argument(
+        "--cache-prune",
+        help="Shrink the cover art cache to its size limit",
+        action="store_true",
+    )
     parser.add_argument("--version", action="version", version=f"%(prog)s {version}")
     args = parser.parse_args(args)
+    if not args.content and not (args.cache_stats or args.cache_prune):
+        parser.error("the following arguments are required: PATH")
 
     if not load_config(args):
         return 1
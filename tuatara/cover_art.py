@@ -15,12 +15,28 @@ from tuatara.settings import settings
 
 
 class CoverArt:
+    # Art is decoded on first use rather than when it is found, as that
+    # is slow for large images; load() may be run on a worker thread
     def __init__(self):
         self.imgdata = None
         self.bg_color = None
         self.fg_color = None
+        self.loaded = False
 
-    def get_image(self): ...
+    def decode(self): ...
+
+    def load(self):
+        if not self.loaded:
+            imgdata = self.decode()
+            if settings.art.get("dynamic_background"):
+                self.bg_color = dominant_color(imgdata)
+                self.fg_color = foreground_for(self.bg_color)
+            self.imgdata = imgdata
+            self.loaded = True
+        return self.imgdata
+
+    def get_image(self):
+        return self.load()
 
 
 class FileCoverArt(CoverArt):
@@ -28,31 +44,40 @@ class FileCoverArt(CoverArt):
         super().__init__()
         self.kind = "file"
         self.path = path
-        self.imgdata = image_from_file(self.path)
 
     def set_path(self, path):
         self.path = path
 
-    def get_image(self):
-        if settings.art.get("dynamic_background"):
-            self.bg_color = dominant_color(self.imgdata)
-            self.fg_color = foreground_for(self.bg_color)
-        return self.imgdata
+    def decode(self):
+        return image_from_file(self.path)
+
+
+class PackedCoverArt(CoverArt):
+    def __init__(self, name, buffer):
+        super().__init__()
+        self.kind = "packed"
+        self.path = name
+        self.buffer = buffer
+
+    def decode(self):
+        return image_from_buffer(self.buffer)
 
 
 class InlineCoverArt(CoverArt):
     def __init__(self, buffer):
         super().__init__()
-        self.imgdata = None
         self.kind = "inline"
+        self.buffer = None
         if buffer:
             self.set_from_buffer(buffer)
+        else:
+            self.loaded = True
 
     def set_from_buffer(self, buffer):
-        self.imgdata = image_from_buffer(buffer)
-        if settings.art.get("dynamic_background"):
-            self.bg_color = dominant_color(self.imgdata)
-            self.fg_color = foreground_for(self.bg_color)
+        # The buffer may be mapped from a GStreamer sample; keep a copy
+        self.buffer = bytes(buffer)
+        self.imgdata = None
+        self.loaded = False
 
-    def get_image(self):
-        return self.imgdata
+    def decode(self):
+        return image_from_buffer(self.buffer)
@@ -7,25 +7,54 @@
 
 import json
 import os
+import time
 import traceback
 
+from concurrent.futures import ThreadPoolExecutor
 from difflib import SequenceMatcher
+from threading import Lock
 from urllib.parse import quote
 
 import urllib3
+from urllib3.util import parse_url
 
 from tuatara.cover_art import FileCoverArt
+from tuatara.response_cache import response_cache
 from tuatara.sanitize import sanitize_artist, sanitize_album
-from tuatara.settings import settings, debug, version
+from tuatara.settings import atomic_write, cache_dir, settings, debug, version
+
+
+class RateLimiter:
+    # Spaces out requests to a service, across all threads using it
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = Lock()
+        self.next_slot = 0
+
+    def wait(self):
+        with self.lock:
+            slot = max(time.monotonic(), self.next_slot)
+            self.next_slot = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
 
 
 class ArtFetcher:
+    # How long search results are served from the response cache
+    # before being revalidated
+    cache_ttl = 24 * 60 * 60
+
     def __init__(self):
         self.http = urllib3.PoolManager()
+        self.rate_limits = {}
 
     def fetch(self, track): ...
 
     def request(self, url, log, method="GET", statuses=[200], **kwargs):
+        limiter = self.rate_limits.get(parse_url(url).host)
+        if limiter:
+            limiter.wait()
         try:
             response = self.http.request(method, url=url, **kwargs)
         except urllib3.exceptions.HTTPError as ex:
@@ -39,6 +68,26 @@ class ArtFetcher:
             return None
         return response
 
+    def request_json(self, url, log, headers={}, **kwargs):
+        cached = response_cache.get(url)
+        if cached and cached.is_fresh():
+            debug(f"Using cached response for {url}")
+            return cached.data
+        headers = dict(headers)
+        statuses = [200]
+        if cached:
+            headers |= cached.validators()
+            statuses.append(304)
+        resp = self.request(url, log, statuses=statuses, headers=headers, **kwargs)
+        if resp is None:
+            return None
+        if resp.status == 304:
+            debug(f"Cached response for {url} is still valid")
+            return response_cache.refresh(cached, resp).data
+        data = resp.json()
+        response_cache.store(url, resp, data, self.cache_ttl)
+        return data
+
     def download(self, url, dest):
         directory = os.path.dirname(dest)
         os.makedirs(directory, mode=0o755, exist_ok=True)
@@ -58,6 +107,8 @@ class AppleArtFetcher(ArtFetcher):
             # We're totally a web browser!
             "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:120.0) Gecko/20100101 Firefox/120.0",
         }
+        # The search API allows roughly 20 requests per minute
+        self.rate_limits = {"itunes.apple.com": RateLimiter(3.0)}
 
     def fetch(self, track):
         def download_url(result):
@@ -73,10 +124,9 @@ class AppleArtFetcher(ArtFetcher):
             f"https://itunes.apple.com/search?media=music&entity=album&term={querystr}"
         )
 
-        resp = self.request(path, "Initial search", headers=self.headers)
-        if resp is None:
+        jsondata = self.request_json(path, "Initial search", headers=self.headers)
+        if jsondata is None:
             return None
-        jsondata = resp.json()
         url = None
         fallback_url = None
         fuzzy_url = None
@@ -125,6 +175,9 @@ class AppleArtFetcher(ArtFetcher):
 
 
 class MusicBrainzArtFetcher(ArtFetcher):
+    # Artist and release data changes rarely
+    cache_ttl = 7 * 24 * 60 * 60
+
     def __init__(self):
         super().__init__()
         self.headers = {
@@ -132,18 +185,57 @@ class MusicBrainzArtFetcher(ArtFetcher):
             # These folks care, we'll be truthful.
             "User-Agent": f"Tuatara/{version} (notting@splat.cc)",
         }
+        # MusicBrainz asks for no more than one request per second;
+        # the Cover Art Archive is more forgiving.
+        self.rate_limits = {
+            "musicbrainz.org": RateLimiter(1.0),
+            "coverartarchive.org": RateLimiter(0.2),
+        }
+        self.probe_pool = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="coverartarchive"
+        )
+        self.artist_lock = Lock()
+        self.artist_ids = {}
+        self.artist_ids_path = None
+
+    def artist_id_file(self):
+        return os.path.join(cache_dir("musicbrainz"), "artists.json")
+
+    def load_artist_ids(self):
+        # Called with artist_lock held. Reloads if the cache dir moved.
+        path = self.artist_id_file()
+        if path == self.artist_ids_path:
+            return
+        self.artist_ids_path = path
+        self.artist_ids = {}
+        try:
+            with open(path, "r") as f:
+                self.artist_ids = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError):
+            debug(f"Ignoring unreadable artist ID cache {path}")
+
+    def save_artist_ids(self):
+        # Called with artist_lock held
+        try:
+            with atomic_write(self.artist_ids_path) as f:
+                json.dump(self.artist_ids, f)
+        except OSError as e:
+            debug(f"Cannot save artist ID cache: {e}")
+
+    def find_artist_id(self, artist):
+        with self.artist_lock:
+            self.load_artist_ids()
+            artist_id = self.artist_ids.get(artist)
+        if artist_id:
+            debug(f"Using known artist ID {artist_id} for {artist}")
+            return artist_id
 
-    def fetch(self, track):
-        artist = sanitize_artist(track.artist)
-        album = sanitize_album(track.album)
-        tracks = track.track_total
-
-        debug(f"Finding art for {track} via MusicBrainz…")
         path = f"https://musicbrainz.org/ws/2/artist?limit=5&query={artist}"
-        resp = self.request(path, "Artist search", headers=self.headers)
-        if resp is None:
+        jsondata = self.request_json(path, "Artist search", headers=self.headers)
+        if jsondata is None:
             return None
-        jsondata = resp.json()
         if jsondata["count"] == 0:
             debug("No artists found")
             return None
@@ -153,14 +245,44 @@ class MusicBrainzArtFetcher(ArtFetcher):
 
         # Go with the first artist
         artist_id = jsondata["artists"][0]["id"]
+        with self.artist_lock:
+            self.load_artist_ids()
+            self.artist_ids[artist] = artist_id
+            self.save_artist_ids()
+        return artist_id
+
+    def probe(self, mbid):
+        path = f"https://coverartarchive.org/release/{mbid}/front"
+
+        resp = self.request(
+            path,
+            "Musicbrainz art redirect",
+            method="HEAD",
+            statuses=[200, 307],
+            headers=self.headers,
+            redirect=False,
+        )
+
+        if resp and resp.status == 307:
+            return resp.get_redirect_location()
+        return None
+
+    def fetch(self, track):
+        artist = sanitize_artist(track.artist)
+        album = sanitize_album(track.album)
+        tracks = track.track_total
+
+        debug(f"Finding art for {track} via MusicBrainz…")
+        artist_id = self.find_artist_id(artist)
+        if not artist_id:
+            return None
 
         path = f'https://musicbrainz.org/ws/2/release?query=release:"{album}" AND arid:{artist_id}'
         if tracks:
             path += f" AND tracksmedium:{tracks}"
-        resp = self.request(path, "Album search", headers=self.headers)
-        if resp is None:  # pragma: no cover
+        jsondata = self.request_json(path, "Album search", headers=self.headers)
+        if jsondata is None:  # pragma: no cover
             return None
-        jsondata = resp.json()
 
         if jsondata["count"] == 0:
             debug("No albums found")
@@ -178,22 +300,15 @@ class MusicBrainzArtFetcher(ArtFetcher):
         ids = [x["id"] for x in results]
         debug(f"Filtered album search yielded {ids}")
 
+        # Probe concurrently, but take the first hit in sorted order.
+        # Probes queued behind it are no longer needed.
         url = None
-        for mbid in ids:
-            path = f"https://coverartarchive.org/release/{mbid}/front"
-
-            resp = self.request(
-                path,
-                "Musicbrainz art redirect",
-                method="HEAD",
-                statuses=[200, 307],
-                headers=self.headers,
-                redirect=False,
-            )
-
-            if resp and resp.status == 307:
-                url = resp.get_redirect_location()
-                break
+        probes = [self.probe_pool.submit(self.probe, mbid) for mbid in ids]
+        for probe in probes:
+            if url:
+                probe.cancel()
+                continue
+            url = probe.result()
 
         if not url:
             debug("No art found for album IDs")
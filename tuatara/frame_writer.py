@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# SPDX-FileCopyrightText: Copyright © 2023 Bill Nottingham <notting@splat.cc>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import fcntl
+import os
+import select
+import struct
+import termios
+
+
+class FrameWriter:
+    # Collects a frame's output and writes it to the terminal in one go.
+    #
+    # The buffer is kept between frames and only ever grows, so a frame
+    # of a size seen before allocates nothing. Escape sequences that are
+    # written over and over (cursor moves, colors) are encoded once.
+    #
+    # Output goes straight to the file descriptor, bypassing sys.stdout;
+    # short writes are continued, and a non-blocking terminal is waited
+    # on until it can take more.
+    def __init__(self, fd):
+        self.fd = fd
+        self.buffer = bytearray()
+        self.length = 0
+        self.fragments = {}
+
+    def append(self, data):
+        end = self.length + len(data)
+        self.buffer[self.length : end] = data
+        self.length = end
+
+    def write(self, text):
+        self.append(text.encode("utf-8"))
+
+    def fragment(self, text):
+        # For escape sequences and other strings that recur every frame
+        data = self.fragments.get(text)
+        if data is None:
+            data = self.fragments[text] = text.encode("utf-8")
+        self.append(data)
+
+    def flush(self):
+        # Returns the number of bytes written
+        length = self.length
+        self.length = 0
+        written = 0
+        with memoryview(self.buffer) as view:
+            while written < length:
+                try:
+                    written += os.write(self.fd, view[written:length])
+                except BlockingIOError:
+                    select.select([], [self.fd], [])
+        return length
+
+    def pending(self):
+        # Bytes written but not yet taken by the terminal (or sshd), where
+        # the system can say
+        request = getattr(termios, "TIOCOUTQ", None)
+        if request is None:
+            return 0
+        try:
+            data = fcntl.ioctl(self.fd, request, b"\0\0\0\0")
+        except OSError:
+            return 0
+        return struct.unpack("i", data)[0]
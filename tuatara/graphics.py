@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+#
+# SPDX-FileCopyrightText: Copyright © 2023 Bill Nottingham <notting@splat.cc>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import base64
+import io
+import os
+import re
+
+from PIL import Image
+
+# Base64 payload bytes per kitty graphics escape
+KITTY_CHUNK = 4096
+
+# Colors in a sixel image's palette
+SIXEL_COLORS = 256
+
+# Six pixel rows as bits, to the sixel character for them
+SIXEL_TABLE = bytes([(x + 63) if x < 64 else 63 for x in range(256)])
+
+# For each color, a table picking out pixels of that color as 1
+SIXEL_MASKS = [bytes(n) + b"\1" + bytes(255 - n) for n in range(SIXEL_COLORS)]
+
+SIXEL_RUN = re.compile(r"(.)\1{3,}")
+
+
+def cell_size(term, font_ratio):
+    # Size of a character cell in pixels, from the terminal if it says
+    if term.pixel_width and term.pixel_height and term.width and term.height:
+        return (term.pixel_width // term.width, term.pixel_height // term.height)
+    return (8, round(8 * font_ratio))
+
+
+def fit(image, box, cell):
+    # Scale an image to cover the box at the terminal's pixel resolution
+    return image.convert("RGB").resize((box.width * cell[0], box.height * cell[1]))
+
+
+class KittyGraphics:
+    # The kitty graphics protocol. Each image is transmitted once under
+    # an id, and then placed (and re-placed after a clear) by id alone.
+    # Images are placed under the text layer, so overlays stay readable.
+    # q=2 keeps the terminal from replying on our input.
+    #
+    # encode() is slow, and is called on a worker thread; its result is
+    # passed to draw() on the main loop, unless sent() says the terminal
+    # already has the image.
+    name = "kitty"
+
+    def __init__(self):
+        self.ids = {}
+        self.next_id = 1
+
+    def encode(self, image, box, cell):
+        png = io.BytesIO()
+        fit(image, box, cell).save(png, format="PNG")
+        return base64.standard_b64encode(png.getvalue()).decode("ascii")
+
+    def sent(self, key):
+        return key in self.ids
+
+    def draw(self, key, box, data):
+        output = ""
+        if key not in self.ids:
+            self.ids[key] = self.next_id
+            self.next_id += 1
+            output += self.transmit(self.ids[key], data)
+        return output + self.place(self.ids[key], box)
+
+    def transmit(self, image_id, payload):
+        chunks = [
+            payload[x : x + KITTY_CHUNK] for x in range(0, len(payload), KITTY_CHUNK)
+        ]
+        output = []
+        for n, chunk in enumerate(chunks):
+            more = 1 if n < len(chunks) - 1 else 0
+            if n == 0:
+                keys = f"a=t,f=100,i={image_id},q=2,m={more}"
+            else:
+                keys = f"m={more}"
+            output.append(f"\x1b_G{keys};{chunk}\x1b\\")
+        return "".join(output)
+
+    def place(self, image_id, box):
+        return (
+            f"\x1b_Ga=p,i={image_id},p=1,c={box.width},r={box.height},"
+            "C=1,z=-1,q=2\x1b\\"
+        )
+
+    def clear(self):
+        # Remove all placements; transmitted images are kept
+        return "\x1b_Ga=d,d=a,q=2\x1b\\"
+
+    def forget(self, key):
+        # Remove an image and free its data in the terminal
+        image_id = self.ids.pop(key, None)
+        if image_id is None:
+            return ""
+        return f"\x1b_Ga=d,d=I,i={image_id},q=2\x1b\\"
+
+
+class SixelGraphics:
+    # Sixel images. They become part of the screen once drawn, so they
+    # are sent again, from the same encoding, whenever they are redrawn.
+    name = "sixel"
+
+    def encode(self, image, box, cell):
+        return sixel(fit(image, box, cell))
+
+    def sent(self, key):
+        return False
+
+    def draw(self, key, box, data):
+        return data
+
+    def clear(self):
+        return ""
+
+    def forget(self, key):
+        return ""
+
+
+def sixel(image):
+    # Octree quantizing is several times faster than median cut, and
+    # good enough for 256 colors
+    img = image.quantize(SIXEL_COLORS, method=Image.Quantize.FASTOCTREE)
+    (width, height) = img.size
+    data = img.tobytes()
+    palette = img.getpalette()
+
+    output = [f'\x1bPq"1;1;{width};{height}']
+    for n in sorted(set(data)):
+        (r, g, b) = palette[3 * n : 3 * n + 3]
+        output.append(
+            f"#{n};2;{round(r * 100 / 255)};{round(g * 100 / 255)};"
+            f"{round(b * 100 / 255)}"
+        )
+
+    bands = []
+    for top in range(0, height, 6):
+        band = data[top * width : (top + 6) * width]
+        rows = [band[x : x + width] for x in range(0, len(band), width)]
+        # Each color used in this band of six rows, as a row of bits. A
+        # row masked to the color is bytes of 0 or 1; as one big integer,
+        # shifting it moves every byte's bit to that row's place.
+        planes = []
+        for color in sorted(set(band)):
+            bits = 0
+            for dy, row in enumerate(rows):
+                if color in row:
+                    bits |= int.from_bytes(row.translate(SIXEL_MASKS[color])) << dy
+            sixels = bits.to_bytes(width).translate(SIXEL_TABLE).decode("ascii")
+            planes.append(f"#{color}" + rle(sixels))
+        bands.append("$".join(planes))
+    output.append("-".join(bands))
+    output.append("\x1b\\")
+    return "".join(output)
+
+
+def rle(sixels):
+    return SIXEL_RUN.sub(lambda m: f"!{len(m.group())}{m.group(1)}", sixels)
+
+
+def detect_protocol(environ=os.environ):
+    # Best guess from the environment; querying the terminal would race
+    # with reading keys
+    term = environ.get("TERM", "")
+    program = environ.get("TERM_PROGRAM", "")
+    if "TMUX" in environ or term.startswith("screen"):
+        return "cells"
+    if term == "xterm-kitty" or "KITTY_WINDOW_ID" in environ or program == "ghostty":
+        return "kitty"
+    if term.startswith(("foot", "mlterm", "contour")) or program == "WezTerm":
+        return "sixel"
+    return "cells"
+
+
+def graphics_for(protocol):
+    if protocol == "auto":
+        protocol = detect_protocol()
+    match protocol:
+        case "kitty":
+            return KittyGraphics()
+        case "sixel":
+            return SixelGraphics()
+    return None
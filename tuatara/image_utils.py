@@ -9,32 +9,74 @@ import io
 
 from functools import cache
 
-import gi
-
-from PIL import Image, ImageEnhance, UnidentifiedImageError
+from PIL import Image, UnidentifiedImageError
 
 from blessed.colorspace import RGB_256TABLE
 
 from tuatara.settings import debug, settings
 
-gi.require_version("GdkPixbuf", "2.0")
-from gi.repository import GdkPixbuf  # noqa: E402, F401
+# Pixels across and down sampled when picking the dominant color
+DOMINANT_SAMPLES = 64
 
+# Each channel cut to 16 levels, spread from 0 to 255
+DOMINANT_LEVELS = [(x >> 4) * 17 for x in range(256)] * 3
 
-def _enhance(image):
-    image = image.convert("RGB")
-    image = ImageEnhance.Brightness(image).enhance(settings.art.get("brightness_adj"))
-    image = ImageEnhance.Contrast(image).enhance(settings.art.get("contrast_adj"))
+# Art is not drawn much larger than this many pixels across, even with a
+# graphics protocol on a large terminal
+MAX_ART_SIZE = 800
+
+
+def _reduce(image):
+    # Decode at the smallest scale that still covers MAX_ART_SIZE. JPEG
+    # can be decoded straight to 1/2, 1/4 or 1/8 scale; anything else is
+    # decoded in full and shrunk by a whole factor before it is kept.
+    target = (MAX_ART_SIZE, MAX_ART_SIZE)
+    if image.format == "JPEG":
+        image.draft(None, target)
+    image.load()
+    factor = min(image.width // MAX_ART_SIZE, image.height // MAX_ART_SIZE)
+    if factor > 1:
+        image = image.convert("RGB").reduce(factor)
     return image
 
 
+@cache
+def _enhance_table(brightness, contrast, mean):
+    # What ImageEnhance.Brightness and then ImageEnhance.Contrast do to
+    # each channel value, as one lookup table
+    table = []
+    for value in range(256):
+        value = min(int(value * brightness), 255)
+        table.append(min(max(int(mean + (value - mean) * contrast), 0), 255))
+    return table * 3
+
+
+def _enhance(image):
+    # Brightness and contrast in a single pass over the image. Contrast
+    # works around the mean gray level of the brightened image; that is
+    # worked out from the channel histograms rather than another image.
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    brightness = settings.art.get("brightness_adj")
+    contrast = settings.art.get("contrast_adj")
+    histogram = image.histogram()
+    pixels = image.width * image.height
+    mean = 0
+    for channel, weight in enumerate((0.299, 0.587, 0.114)):
+        counts = histogram[channel * 256 : (channel + 1) * 256]
+        total = sum([n * min(int(v * brightness), 255) for v, n in enumerate(counts)])
+        mean += weight * total / max(pixels, 1)
+    return image.point(_enhance_table(brightness, contrast, int(mean + 0.5)))
+
+
 def image_from_file(path):
     try:
         img = Image.open(path)
-    except (PermissionError, UnidentifiedImageError):
+    except OSError:
+        # Unreadable, gone, or not an image
         debug(f"Cannot process art file {path}")
         return None
-    img.load()
+    img = _reduce(img)
     img = _enhance(img)
     return img
 
@@ -45,45 +87,41 @@ def image_from_buffer(buffer):
         img = Image.open(iobuffer)
     except UnidentifiedImageError:
         return None
-    img.load()
+    img = _reduce(img)
     img = _enhance(img)
     return img
 
 
-def image_from_pixbuf(pixbuf):
-    if not pixbuf:
-        return None
-    data = pixbuf.get_pixels()
-    mode = "RGB"
-    if pixbuf.props.has_alpha is True:
-        mode = "RGBA"
-    img = Image.frombytes(mode, (pixbuf.props.width, pixbuf.props.height), data, "raw")
-    return img
+def image_from_frame(data, width, height):
+    # Copies raw RGB video frame data into an image of its own, which
+    # outlives the mapped buffer. Rows are padded when the width is not
+    # a multiple of four pixels.
+    stride = len(data) // height
+    return Image.frombytes("RGB", (width, height), data, "raw", "RGB", stride, 1)
 
 
 def dominant_color(img):
     # Reasonably fast colorthief using just Pillow
     #
-    # Quantize the image, throw out "mostly white", pick the most used
+    # Sample the image down to a thumbnail, count colors at 16 levels per
+    # channel, throw out "mostly white", pick the most used
     if not img:
         return (0, 0, 0)
-    quantimg = img.quantize().convert("RGB")
-    colors = quantimg.getcolors()
-    colors = list(
-        filter(
-            lambda x: sum(x[1][0:3]) < 700 * settings.art.get("brightness_adj"), colors
-        )
-    )
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    thumbnail = img.resize(
+        (DOMINANT_SAMPLES, DOMINANT_SAMPLES), Image.Resampling.NEAREST
+    ).point(DOMINANT_LEVELS)
+    limit = 700 * settings.art.get("brightness_adj")
+    colors = [x for x in thumbnail.getcolors(4096) if sum(x[1]) < limit]
+    # Ties are broken by the color itself, so the result never depends
+    # on the order getcolors() happens to return
     colors.sort(reverse=True)
-    color = None
-    for i in range(len(colors)):
+    for i, (count, color) in enumerate(colors):
         # Avoid black unless it's really dominant
-        if sum(colors[i][1][0:3]) > 100 or colors[i][0] / colors[i + 1][0] > 20:
-            color = colors[i][1]
-            break
-    if not color:
-        color = (0, 0, 0)
-    return color
+        if sum(color) > 100 or i == len(colors) - 1 or count / colors[i + 1][0] > 20:
+            return color
+    return (0, 0, 0)
 
 
 def foreground_for(color):
@@ -94,6 +132,9 @@ def foreground_for(color):
         return (225, 225, 225)
 
 
+_downconverted = None
+
+
 @cache
 def get_palette(colors):
     if colors > 256:
@@ -108,14 +149,29 @@ def get_palette(colors):
 
 
 def downconvert(image, width, height, colors):
+    # Shrink first, then map to the terminal's palette once, dithering
+    # only where there are too few colors to do without. The last result
+    # is kept, as the same art is redrawn at the same size whenever the
+    # screen is cleared, and art is downconverted ahead of time on a
+    # worker thread.
+    global _downconverted
+    key = (width, height, colors)
+    last = _downconverted
+    if last and last[0] is image and last[1] == key:
+        return last[2]
     palette = get_palette(colors)
     if colors == 16:
         dither = Image.Dither.FLOYDSTEINBERG
     else:
         dither = Image.Dither.NONE
+    result = image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=2.0)
     if palette:
-        image = image.quantize(colors, palette=palette, dither=dither).convert("RGB")
-    image = image.resize((width, height))
-    if palette:
-        image = image.quantize(colors, palette=palette, dither=dither).convert("RGB")
-    return image
+        result = result.quantize(colors, palette=palette, dither=dither).convert("RGB")
+    _downconverted = (image, key, result)
+    return result
+
+
+def enlarge(image, width, height):
+    # Blow an image up with hard edges, so each pixel becomes a block of
+    # identical cells
+    return image.resize((width, height), Image.Resampling.NEAREST)
@@ -8,9 +8,10 @@
 import os
 import signal
 import sys
+import time
 import traceback
 
-from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 from urllib3.util import parse_url
 
@@ -18,10 +19,34 @@ import blessed
 
 from gi.repository import GLib
 
-from tuatara.image_utils import downconvert
+from tuatara.art_cache import art_cache
+from tuatara.frame_writer import FrameWriter
+from tuatara.graphics import cell_size, graphics_for
+from tuatara.image_utils import downconvert, enlarge
+from tuatara.perf import PerfCounters
+from tuatara.renderer import RAMP, ArtRenderer, ColorTable
+from tuatara.spectrum import bar_colors, bar_rows, columns
+from tuatara.throttle import Throttle
 
 from tuatara.settings import settings, debug, version
 
+# Threads decoding and downconverting cover art, and encoding it for a
+# graphics protocol
+ART_WORKERS = 2
+
+# Background of the art box while the art is still being decoded
+PLACEHOLDER_COLOR = (40, 40, 40)
+
+# Milliseconds without a resize before the window counts as settled
+RESIZE_DELAY = 150
+
+# Rendered (or encoded) art kept for the current track, one per art box
+# geometry
+ART_RENDERS = 8
+
+# Laid out info panel lines kept before starting afresh
+LAYOUT_LIMIT = 256
+
 
 class Window:
     def __init__(self):
@@ -66,6 +91,11 @@ class Window:
 class Interface:
     def __init__(self):
         self.term = blessed.Terminal()
+        self.renderer = ArtRenderer(self.term)
+        self.perf = PerfCounters()
+        self.perf_shown = False
+        self.perf_used = False
+        self.writer = FrameWriter(self.term.stream.fileno())
         if "number_of_colors" in settings.art:
             self.term.number_of_colors = settings.art.get("number_of_colors")
         if self.term.number_of_colors < 256 and settings.art.get("dynamic_background"):
@@ -78,34 +108,183 @@ class Interface:
             debug("Dynamic background color unavailable due to `ascii_truecolor`")
             art["dynamic_background"] = False
             settings.merge_art(art)
+        if settings.art.get("half_block") and (
+            self.term.number_of_colors < 256 or settings.art.get("ascii_truecolor")
+        ):
+            debug("Half-block art unavailable with limited colors or `ascii_truecolor`")
+            settings.merge_art({"half_block": False})
+        # RGB to escape sequence, for this terminal's colors
+        self.set_color = ColorTable(self.term)
+        self.set_bg_color = ColorTable(self.term, background=True)
+        self.capped_tables = {}
+        self.throttle = Throttle(
+            settings.art.get("throttle"), self.term.number_of_colors
+        )
+        self.write_time = 0.0
+        # Image rows drawn in each row of cells
+        self.rows_per_cell = 2 if settings.art.get("half_block") else 1
+        self.graphics = graphics_for(settings.art.get("image_protocol"))
+        if self.graphics:
+            debug(f"Drawing cover art with {self.graphics.name} graphics")
         self.set_title(f"Tutatara {version}")
         self.help_canvas = self.populate_help()
         self.art_shown = None
+        self.shown_art = None
         self.help_shown = False
         self.vis_shown = False
         self.current_track = None
         self.mainloop = None
+        self.player = None
         self.need_resize = True
+        self.resizing = False
         self.error = None
         self.colorstr = ""
-        signal.signal(signal.SIGWINCH, self.sigwinch_handler)
+        self.dirty = set()
+        self.art_pool = ThreadPoolExecutor(max_workers=ART_WORKERS)
+        self.art_loading = set()
+        self.art_renders = {}
+        self.art_images = {}
+        self.layouts = {}
+        self.titles = None
+        self.redraw_source = None
+        self.retry_source = None
+        self.status_source = None
+        self.resize_source = None
         signal.signal(signal.SIGINT, self.stop)
 
     def set_title(self, title):
-        sys.stdout.write("\x1b]0;" + title + "\x07")
+        self.writer.write("\x1b]0;" + title + "\x07")
+
+    def flush(self):
+        start = time.perf_counter()
+        with self.perf.measure("write"):
+            size = self.writer.flush()
+        self.write_time = time.perf_counter() - start
+        self.perf.frame(size)
+        self.perf.key_handled()
+
+    def sigwinch_handler(self):
+        # Dragging a window edge sends a storm of these. The text is laid
+        # out again straight away, but art and visualization wait until
+        # the size has settled.
+        self.need_resize = True
+        self.resizing = True
+        if self.resize_source:
+            GLib.source_remove(self.resize_source)
+        self.resize_source = GLib.timeout_add(RESIZE_DELAY, self.resize_settled)
+        self.request_redraw()
+        return True
 
-    def sigwinch_handler(self, signum=None, stack=None):
+    def resize_settled(self):
+        self.resize_source = None
+        self.resizing = False
         self.need_resize = True
+        self.request_redraw()
+        return False
+
+    def request_redraw(self, *parts):
+        # Mark parts of the screen ("text", "status", "art", "vis") as
+        # needing a redraw, and redraw once the main loop is idle
+        self.dirty.update(parts)
+        if not self.redraw_source:
+            self.redraw_source = GLib.idle_add(self.display_info)
+        return False
+
+    def player_changed(self, reason):
+        match reason:
+            case "track" | "tags":
+                self.request_redraw("text", "status", "art")
+            case "state" | "seek":
+                self.request_redraw("status")
+            case "vis":
+                if self.vis_shown:
+                    self.request_redraw("vis")
+                return
+        self.update_timers()
+
+    def cover_art_found(self):
+        # Called from the fetch thread
+        GLib.idle_add(self.request_redraw, "art")
+
+    def load_art(self, cover_art):
+        # Decode the art, and downconvert it for the art box, on a worker.
+        # It is drawn once it is ready.
+        if cover_art in self.art_loading:
+            return
+        self.art_loading.add(cover_art)
+        future = self.art_pool.submit(
+            self.prepare_art, cover_art, self.art_pixels, self.term.number_of_colors
+        )
+        future.add_done_callback(
+            lambda future: GLib.idle_add(self.art_loaded, cover_art, future)
+        )
 
-    @lru_cache(maxsize=256)
-    def set_color(self, colortuple):
-        (r, g, b) = colortuple
-        return self.term.color_rgb(r, g, b)
+    def prepare_art(self, cover_art, size, colors):
+        # Runs on a worker thread
+        image = cover_art.load()
+        if image and not self.graphics:
+            downconvert(image, *size, colors)
+
+    def art_loaded(self, cover_art, future):
+        self.art_loading.discard(cover_art)
+        if future.exception():
+            debug(f"Cannot load cover art: {future.exception()}")
+            cover_art.loaded = True
+        if self.current_track and self.current_track.cover_art is cover_art:
+            self.request_redraw("art")
+        return False
+
+    def encode_art(self, cover_art, image):
+        # Fit the art to the art box, and encode it for the graphics
+        # protocol, on a worker. It is drawn once it is ready.
+        key = self.image_key(cover_art)
+        if key in self.art_loading:
+            return
+        self.art_loading.add(key)
+        future = self.art_pool.submit(
+            self.graphics.encode, image, self.art_box, self.cell_size
+        )
+        future.add_done_callback(
+            lambda future: GLib.idle_add(self.art_encoded, key, future)
+        )
 
-    @lru_cache(maxsize=256)
-    def set_bg_color(self, colortuple):
-        (r, g, b) = colortuple
-        return self.term.on_color_rgb(r, g, b)
+    def art_encoded(self, key, future):
+        self.art_loading.discard(key)
+        if future.exception():
+            # Drawn with cells instead
+            debug(f"Cannot encode cover art: {future.exception()}")
+            data = None
+        else:
+            data = future.result()
+        cover_art = key[0]
+        if self.current_track and self.current_track.cover_art is cover_art:
+            if len(self.art_images) >= ART_RENDERS:
+                del self.art_images[next(iter(self.art_images))]
+            self.art_images[key] = data
+            self.request_redraw("art")
+        return False
+
+    def tick_status(self):
+        self.request_redraw("status")
+        return True
+
+    def update_timers(self):
+        # The status line only changes while playing. Visualization
+        # frames are drawn as the player delivers them. Nothing ticks
+        # while paused.
+        playing = self.player.is_playing()
+        if playing and not self.status_source:
+            self.status_source = GLib.timeout_add_seconds(1, self.tick_status)
+        elif not playing and self.status_source:
+            GLib.source_remove(self.status_source)
+            self.status_source = None
+        if not (playing and self.vis_shown):
+            self.perf.vis_stopped()
+
+    def retry(self):
+        self.retry_source = None
+        self.request_redraw()
+        return False
 
     def set_size(self):
         text_box = Window()
@@ -143,71 +322,190 @@ class Interface:
             art_box.left = (self.term.width - art_box.width) // 2
         self.art_box = art_box
         self.text_box = text_box
+        # A cell is font_ratio times taller than it is wide, so the box is
+        # square on screen. In half-block mode each cell holds two pixels
+        # stacked, each 1 by font_ratio / 2.
+        self.art_pixels = (art_box.width, art_box.height * self.rows_per_cell)
+        self.cell_size = cell_size(self.term, ratio)
+        self.layouts.clear()
         self.clear_display = True
 
+    def clear_screen(self):
+        self.renderer.invalidate()
+        self.writer.fragment(self.term.clear)
+        if self.graphics:
+            self.writer.fragment(self.graphics.clear())
+
+    def tables_for(self, colors):
+        # Color tables for fewer colors than the terminal has
+        if colors not in self.capped_tables:
+            self.capped_tables[colors] = (
+                ColorTable(self.term, colors=colors),
+                ColorTable(self.term, background=True, colors=colors),
+            )
+        return self.capped_tables[colors]
+
+    def adapt(self):
+        # After a visualization frame has been written; step the level of
+        # detail up or down if the terminal is falling behind or has
+        # caught up
+        fps = settings.art.get("vis_fps")
+        interval = self.throttle.divisor / fps
+        if self.throttle.update(self.write_time, self.writer.pending(), interval):
+            debug(f"Visualization now drawn at {self.throttle.name} detail")
+            self.player.set_vis_rate(max(fps // self.throttle.divisor, 1))
+            self.request_redraw("status")
+
+    def art_key(self, cover_art):
+        box = self.art_box
+        return (cover_art, box.left, box.top, box.width, box.height)
+
+    def image_key(self, cover_art):
+        box = self.art_box
+        return (cover_art, box.width, box.height, self.cell_size)
+
+    def fit_line(self, text):
+        # A line of the info panel, fitted to the text box and centered
+        width = self.text_box.width
+        if self.term.length(text) > width - 2:
+            text = self.term.truncate(text, width - 3) + "…"
+        return self.term.center(text + self.colorstr, width)
+
+    def layout(self, text):
+        # The same few lines are drawn again after every clear, and
+        # measuring them is not cheap, so they are kept. The status line
+        # changes every second, and is not (see display_info()).
+        key = (text, self.text_box.width, self.colorstr)
+        line = self.layouts.get(key)
+        if line is None:
+            if len(self.layouts) >= LAYOUT_LIMIT:
+                self.layouts.clear()
+            line = self.layouts[key] = self.fit_line(text)
+        return line
+
+    def track_titles(self, track):
+        # The title shown, and the window title, for a track
+        key = (track.url, track.title, track.artist)
+        if not self.titles or self.titles[0] != key:
+            if track.title:
+                titles = (track.title, f"{track.artist} - {track.title}")
+            else:
+                name = os.path.basename(parse_url(track.url).path)
+                titles = (name, name)
+            self.titles = (key, titles)
+        return self.titles[1]
+
     def bold_with_bg(self, text):
         text = self.term.bold(text) + self.colorstr
         return text
 
-    def display_info(self, player):
-        def display_ascii(image, clear=False):
-            RAMP = " .'`^\",:;Il!i><~+_-?][}{1)(|\\/tfjrxnuvczXYUJCLQ0OZmwqpdbkhao*#MW&8%B@$"
-
+    def display_info(self):
+        def display_ascii(image, clear=False, cover_art=None, vis=False):
             if not image:
                 return
 
+            colors = self.term.number_of_colors
+            (set_color, set_bg_color) = (self.set_color, self.set_bg_color)
+            scale = 1
+            if vis:
+                # Less detail when the terminal cannot keep up
+                scale = self.throttle.scale
+                if self.throttle.colors < colors:
+                    colors = self.throttle.colors
+                    (set_color, set_bg_color) = self.tables_for(colors)
             if self.term.number_of_colors < 256 or settings.art.get("ascii_truecolor"):
                 ramp = RAMP
-                colorfunc = self.set_color
+                colorfunc = set_color
             else:
                 ramp = " "
-                colorfunc = self.set_bg_color
-            output = self.colorstr
+                colorfunc = set_bg_color
+            (width, height) = self.art_pixels
+            self.writer.fragment(self.colorstr)
             if clear:
-                output += self.term.clear
-
-            img = downconvert(
-                image,
-                self.art_box.width,
-                self.art_box.height,
-                self.term.number_of_colors,
-            )
-
-            grayscale_img = img.convert("L")
-
-            for h in range(self.art_box.height):
-                output += self.term.move_xy(self.art_box.left, self.art_box.top + h)
-                output += self.colorstr
-                for w in range(self.art_box.width):
-                    brightness = grayscale_img.getpixel((w, h)) / 255
-                    r, g, b = img.getpixel((w, h))[:3]
-                    ascii_char = ramp[int(brightness * (len(ramp) - 1))]
-
-                    output += colorfunc((r, g, b)) + ascii_char
-                output += self.term.normal
+                self.clear_screen()
 
-            sys.stdout.write(output)
+            # Art drawn after a clear is the same for the same box, so
+            # returning to an earlier window size costs nothing
+            key = self.art_key(cover_art)
+            if cover_art and key in self.art_renders:
+                self.writer.write(self.art_renders[key])
+                return
 
-        def display_str(text, offset):
-            def fitted(text):
-                if self.term.length(text) <= (self.text_box.width - 2):
-                    return text
+            with self.perf.measure("downconvert"):
+                if scale > 1:
+                    img = downconvert(
+                        image, max(width // scale, 1), max(height // scale, 1), colors
+                    )
+                    img = enlarge(img, width, height)
                 else:
-                    return self.term.truncate(text, self.text_box.width - 3) + "…"
+                    img = downconvert(image, width, height, colors)
 
-            text = fitted(text)
-            output = self.term.move_xy(
-                self.text_box.left,
-                self.text_box.top + self.text_box.height // 2 + offset,
+            with self.perf.measure("encode"):
+                if self.rows_per_cell == 2:
+                    output = self.renderer.render_half(
+                        img, self.art_box, self.colorstr, set_color, colorfunc
+                    )
+                else:
+                    output = self.renderer.render(
+                        img, self.art_box, self.colorstr, ramp, colorfunc
+                    )
+                self.writer.write(output)
+            if cover_art:
+                if len(self.art_renders) >= ART_RENDERS:
+                    del self.art_renders[next(iter(self.art_renders))]
+                self.art_renders[key] = output
+
+        def display_image(cover_art, data):
+            box = self.art_box
+            self.writer.fragment(self.colorstr)
+            self.clear_screen()
+            self.writer.fragment(self.term.move_xy(box.left, box.top))
+            with self.perf.measure("encode"):
+                self.writer.write(self.graphics.draw(cover_art, box, data))
+
+        def display_placeholder():
+            box = self.art_box
+            self.renderer.invalidate()
+            self.writer.fragment(self.set_bg_color(PLACEHOLDER_COLOR))
+            for h in range(box.height):
+                self.writer.fragment(self.term.move_xy(box.left, box.top + h))
+                self.writer.write(" " * box.width)
+            self.writer.fragment(self.term.normal + self.colorstr)
+
+        def display_spectrum(magnitudes):
+            if not magnitudes:
+                return
+            box = self.art_box
+            with self.perf.measure("encode"):
+                colors = bar_colors(box.height)
+                escapes = self.renderer.escapes_for(self.set_color, colors)
+                rows = bar_rows(columns(magnitudes, box.width), box.height)
+                grid = [
+                    ([escapes[color]] * box.width, row)
+                    for color, row in zip(colors, rows)
+                ]
+                self.writer.write(self.renderer.draw(grid, box, self.colorstr))
+
+        def display_str(text, offset, keep=True):
+            self.writer.fragment(
+                self.term.move_xy(
+                    self.text_box.left,
+                    self.text_box.top + self.text_box.height // 2 + offset,
+                )
             )
-            output += self.colorstr
-            text += self.colorstr
-            output += self.term.center(text, self.text_box.width)
-            sys.stdout.write(output)
+            self.writer.fragment(self.colorstr)
+            self.writer.write(self.layout(text) if keep else self.fit_line(text))
+
+        self.redraw_source = None
+        player = self.player
+        dirty = self.dirty
+        self.dirty = set()
 
         if self.need_resize:
             self.set_size()
             self.need_resize = False
+            if not self.resizing:
+                player.set_vis_size(*self.art_pixels)
 
         status = player.get_status()
         if status == "finished":
@@ -217,62 +515,130 @@ class Interface:
         track = player.get_current_track()
 
         if track != self.current_track:
+            self.art_renders.clear()
+            self.art_images.clear()
+            self.layouts.clear()
             self.clear_display = True
             self.art_shown = False
             self.colorstr = ""
         self.current_track = track
 
+        # Art changes with the track, and when art found later (in the
+        # tags, or fetched) replaces what was there
+        cover_art = track.cover_art if track else None
+        if cover_art is not self.shown_art:
+            if self.graphics and self.shown_art:
+                self.writer.write(self.graphics.forget(self.shown_art))
+            self.shown_art = cover_art
+            self.art_shown = False
+
         if not track:
-            sys.stdout.write(self.term.normal + self.term.clear)
-            sys.stdout.flush()
-            return True
+            self.writer.fragment(self.term.normal)
+            self.clear_screen()
+            self.flush()
+            return False
 
         if status == "not ready":
-            return True
+            # Nothing to say about this track yet; look again shortly
+            self.dirty |= dirty
+            if not self.retry_source:
+                self.retry_source = GLib.timeout_add(100, self.retry)
+            return False
 
+        vis_drawn = False
+        cleared = self.clear_display
         if self.clear_display:
             self.art_shown = False
-            sys.stdout.write(self.term.normal + self.term.clear)
+            self.writer.fragment(self.term.normal)
+            self.clear_screen()
             self.clear_display = False
-
-        if track.title:
-            titlestr = track.title
-            windowtitle = f"{track.artist} - {track.title}"
-        else:
-            parsed_url = parse_url(track.url)
-            titlestr = os.path.basename(parsed_url.path)
-            windowtitle = titlestr
-        display_str(self.bold_with_bg(titlestr), -2)
-        self.set_title(windowtitle)
-
-        if track.artist:
-            display_str(track.artist, -1)
-
-        if track.album:
-            display_str(track.album, 0)
-
-        display_str(player.get_status_str(), 2)
+            dirty |= {"text", "status", "art", "vis"}
 
         if not track.cover_art and track.fetch_status == "not_started":
-            track.find_cover_art()
+            track.find_cover_art(self.cover_art_found)
         if self.vis_shown:
-            self.colorstr = ""
-            display_ascii(player.get_vis_frame())
+            if "vis" in dirty and not self.resizing:
+                self.colorstr = ""
+                if player.uses_spectrum():
+                    display_spectrum(player.get_magnitudes())
+                    vis_drawn = True
+                else:
+                    # After a clear, redraw the last frame if there is no
+                    # new one
+                    with player.vis_frame(repeat=cleared) as image:
+                        if image:
+                            display_ascii(image, vis=True)
+                            vis_drawn = True
         else:
-            if not self.art_shown and track.cover_art:
+            if not self.art_shown and track.cover_art and not track.cover_art.loaded:
+                self.load_art(track.cover_art)
+                if "art" in dirty:
+                    display_placeholder()
+            elif not self.art_shown and track.cover_art:
                 img = track.cover_art.get_image()
                 if track.cover_art.bg_color:
                     self.colorstr = self.set_bg_color(track.cover_art.bg_color)
                 if track.cover_art.fg_color:
                     self.colorstr += self.set_color(track.cover_art.fg_color)
-                display_ascii(img, clear=True)
-                self.art_shown = True
+                if (
+                    self.resizing
+                    and self.art_key(track.cover_art) not in self.art_renders
+                ):
+                    # Not worth rendering at a size that is about to change
+                    if "art" in dirty:
+                        display_placeholder()
+                elif (
+                    self.graphics
+                    and img
+                    and not self.graphics.sent(track.cover_art)
+                    and self.image_key(track.cover_art) not in self.art_images
+                ):
+                    self.encode_art(track.cover_art, img)
+                    if "art" in dirty:
+                        display_placeholder()
+                else:
+                    # Encoded art is None if encoding failed
+                    data = self.art_images.get(self.image_key(track.cover_art))
+                    if (
+                        self.graphics
+                        and img
+                        and (data or self.graphics.sent(track.cover_art))
+                    ):
+                        display_image(track.cover_art, data)
+                    else:
+                        display_ascii(img, clear=True, cover_art=track.cover_art)
+                    self.art_shown = True
+                # That cleared the screen, and changed the colors
+                dirty |= {"text", "status"}
+
+        if "text" in dirty:
+            (titlestr, windowtitle) = self.track_titles(track)
+            display_str(self.bold_with_bg(titlestr), -2)
+            self.set_title(windowtitle)
+
+            if track.artist:
+                display_str(track.artist, -1)
+
+            if track.album:
+                display_str(track.album, 0)
+
+        if "status" in dirty:
+            status_str = player.get_status_str()
+            if self.vis_shown and self.throttle.level:
+                status_str = f"{status_str} [{self.throttle.name.upper()}]"
+            display_str(status_str, 2, keep=False)
 
         if self.help_shown:
             self.display_help()
 
-        sys.stdout.flush()
-        return True
+        if self.perf_shown:
+            self.display_perf()
+
+        self.flush()
+        if vis_drawn:
+            self.perf.vis_frame(self.throttle.divisor / settings.art.get("vis_fps"))
+            self.adapt()
+        return False
 
     def populate_help(self):
         help_entries = [
@@ -284,6 +650,7 @@ class Interface:
             ("n, PgDn ", ": Next track"),
             ("m       ", ": Toggle mute/unmute"),
             ("v       ", ": Toggle visualization"),
+            ("s       ", ": Toggle performance statistics"),
             ("+, =    ", ": Volume up"),
             ("-, _    ", ": Volume down"),
             ("Esc     ", ": Close help screen"),
@@ -318,24 +685,42 @@ class Interface:
         h = len(self.help_canvas)
         w = self.term.length(self.help_canvas[0])
         offset = (self.term.height - h) // 2
-        output = ""
         for line in range(h):
-            output += self.term.move_xy((self.term.width - w) // 2, offset + line)
-            output += self.help_canvas[line]
-        sys.stdout.write(output)
+            self.writer.fragment(
+                self.term.move_xy((self.term.width - w) // 2, offset + line)
+            )
+            self.writer.fragment(self.help_canvas[line])
+
+    def display_perf(self):
+        text = self.term.truncate(self.perf.overlay(), self.term.width)
+        self.writer.fragment(self.term.move_xy(0, 0) + self.term.normal)
+        self.writer.write(self.term.reverse(self.term.ljust(text, self.term.width)))
 
     def toggle_vis(self):
         self.vis_shown = not self.vis_shown
+        self.player.set_vis_enabled(self.vis_shown)
         self.clear_display = True
+        self.update_timers()
+        self.request_redraw()
+
+    def toggle_perf(self):
+        self.perf_shown = not self.perf_shown
+        self.perf_used = True
+        if not self.perf_shown:
+            self.clear_display = True
+        self.request_redraw()
 
     def show_help(self):
         self.help_shown = True
+        self.request_redraw()
 
     def hide_help(self):
         self.help_shown = False
         self.clear_display = True
+        self.request_redraw()
 
     def process_keys(self, fd, condition, player):
+        self.perf.key_pressed()
         while True:
             key = self.term.inkey(timeout=0)
             if not key:
@@ -344,7 +729,6 @@ class Interface:
                 match key.name:
                     case "KEY_ESCAPE":
                         self.hide_help()
-                        self.display_info(player)
                     case "KEY_PGUP":
                         player.prev()
                     case "KEY_PGDOWN":
@@ -378,8 +762,13 @@ class Interface:
                         player.raise_volume()
                     case "-" | "_":
                         player.lower_volume()
+                    case "s":
+                        self.toggle_perf()
                     case "?" | "h":
                         self.show_help()
+        if not self.redraw_source:
+            # Nothing to show for it
+            self.perf.key_ignored()
         return True
 
     def excepthook(self, ex_type, ex_value, tb):
@@ -399,9 +788,22 @@ class Interface:
                 self.process_keys,
                 player,
             )
-            GLib.timeout_add(20, self.display_info, player)
+            GLib.unix_signal_add(
+                GLib.PRIORITY_DEFAULT, signal.SIGWINCH, self.sigwinch_handler
+            )
+            self.player = player
+            player.add_listener(self.player_changed)
+            self.update_timers()
+            self.request_redraw()
             self.mainloop.run()
+        self.art_pool.shutdown(wait=False, cancel_futures=True)
+        art_cache.flush()
         player.stop(self.error)
+        summary = self.perf.summary()
+        for line in summary:
+            debug(line)
+        if self.perf_used:
+            print("\n".join(summary))
 
     def stop(self, signum=None, stack=None):
         self.mainloop.quit()
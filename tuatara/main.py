@@ -9,6 +9,8 @@
 
 import sys
 
+from tuatara import art_cache
+from tuatara.art_warmer import warm_art
 from tuatara.config import setup_config
 from tuatara.interface import Interface
 from tuatara.playlist import create_playlist, shuffle
@@ -18,6 +20,15 @@ from tuatara.player import Player
 def main():
     args = setup_config()
 
+    if args.cache_stats:
+        return art_cache.print_stats()
+
+    if args.cache_prune:
+        return art_cache.prune()
+
+    if args.warm_art:
+        return warm_art(args.content)
+
     playlist = create_playlist(args.content)
 
     if playlist == []:
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+#
+# SPDX-FileCopyrightText: Copyright © 2023 Bill Nottingham <notting@splat.cc>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import time
+
+from collections import deque
+from contextlib import contextmanager
+
+STAGES = ("downconvert", "encode", "write")
+
+# Weight of the newest frame in the overlay's running averages
+SMOOTHING = 0.1
+
+
+class PerfCounters:
+    # Render statistics, for the performance overlay and the summary on
+    # exit. Stage times are accumulated by measure() while a frame is
+    # drawn, and folded in by frame() once it has been written.
+    def __init__(self):
+        self.started = time.monotonic()
+        self.frames = 0
+        self.frame_times = deque(maxlen=120)
+        self.current = dict.fromkeys(STAGES, 0.0)
+        self.totals = dict.fromkeys(STAGES, 0.0)
+        self.recent = dict.fromkeys(STAGES, 0.0)
+        self.bytes_total = 0
+        self.bytes_recent = 0.0
+        self.last_vis = None
+        self.vis_frames = 0
+        self.vis_dropped = 0
+        self.key_time = None
+        self.latencies = deque(maxlen=100)
+        self.latency_max = 0.0
+
+    def smooth(self, average, value):
+        return average + SMOOTHING * (value - average)
+
+    @contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current[stage] += time.perf_counter() - start
+
+    def frame(self, size):
+        self.frames += 1
+        self.frame_times.append(time.monotonic())
+        for stage in STAGES:
+            self.totals[stage] += self.current[stage]
+            self.recent[stage] = self.smooth(self.recent[stage], self.current[stage])
+            self.current[stage] = 0.0
+        self.bytes_total += size
+        self.bytes_recent = self.smooth(self.bytes_recent, size)
+
+    def fps(self):
+        # Frames drawn in the last second
+        since = time.monotonic() - 1.0
+        return len([x for x in self.frame_times if x > since])
+
+    def vis_frame(self, interval):
+        # A visualization frame was drawn; anything later than half an
+        # interval past when it was due means frames were skipped
+        now = time.monotonic()
+        self.vis_frames += 1
+        if self.last_vis is not None:
+            late = (now - self.last_vis) / interval
+            if late >= 1.5:
+                self.vis_dropped += round(late) - 1
+        self.last_vis = now
+
+    def vis_stopped(self):
+        # Pausing or hiding the visualization is not a dropped frame
+        self.last_vis = None
+
+    def key_pressed(self):
+        if self.key_time is None:
+            self.key_time = time.perf_counter()
+
+    def key_ignored(self):
+        self.key_time = None
+
+    def key_handled(self):
+        # The key's effect has been written to the terminal
+        if self.key_time is None:
+            return
+        latency = time.perf_counter() - self.key_time
+        self.latencies.append(latency)
+        self.latency_max = max(self.latency_max, latency)
+        self.key_time = None
+
+    def overlay(self):
+        times = " ".join(
+            [f"{stage} {self.recent[stage] * 1000:.1f}" for stage in STAGES]
+        )
+        latency = self.latencies[-1] * 1000 if self.latencies else 0
+        return (
+            f"{self.fps()} fps | {times} ms | "
+            f"{self.bytes_recent / 1024:.1f} KiB/frame | "
+            f"{self.vis_dropped} dropped | key {latency:.0f} ms"
+        )
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        frames = max(self.frames, 1)
+        lines = [
+            f"Frames: {self.frames} in {elapsed:.1f}s "
+            f"({self.frames / max(elapsed, 0.001):.1f} fps)"
+        ]
+        for stage in STAGES:
+            lines.append(
+                f"{stage.capitalize()}: {self.totals[stage] * 1000 / frames:.2f} ms/frame"
+            )
+        lines.append(f"Written: {self.bytes_total / frames / 1024:.1f} KiB/frame")
+        lines.append(
+            f"Visualization frames: {self.vis_frames} drawn, {self.vis_dropped} dropped"
+        )
+        if self.latencies:
+            average = sum(self.latencies) / len(self.latencies)
+            lines.append(
+                f"Key latency: {average * 1000:.1f} ms average, "
+                f"{self.latency_max * 1000:.1f} ms worst"
+            )
+        return lines
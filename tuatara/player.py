@@ -5,16 +5,19 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 #
 
+from contextlib import contextmanager
+
 from urllib3.util import parse_url
 
 from tuatara.cover_art import InlineCoverArt
-from tuatara.image_utils import image_from_pixbuf
+from tuatara.image_utils import image_from_frame
 from tuatara.settings import settings, debug
+from tuatara.spectrum import BANDS_PER_COLUMN, THRESHOLD, parse_magnitudes
 
 import gi
 
 gi.require_version("Gst", "1.0")
-from gi.repository import Gst  # noqa: E402
+from gi.repository import GLib, Gst  # noqa: E402
 
 GST_PLAY_FLAG_VIS = 1 << 3
 
@@ -24,22 +27,126 @@ class Player:
         Gst.init()
         self.playlist = []
         self.playbin = Gst.ElementFactory.make("playbin", "player")
-        self.pixbuf_sink = Gst.ElementFactory.make("gdkpixbufsink", "pixbuf_sink")
-        self.pixbuf_sink.set_property("post-messages", False)
-        self.playbin.set_property("video-sink", self.pixbuf_sink)
-        self.vis_plugin = Gst.ElementFactory.make(
-            settings.art.get("visualization", "vis")
-        )
+        self.playbin.set_property("video-sink", self.make_vis_sink())
+        self.vis_plugin = None
+        self.spectrum = None
+        self.magnitudes = None
+        if settings.art.get("visualization") == "spectrum":
+            self.spectrum = self.make_spectrum()
+        else:
+            self.vis_plugin = Gst.ElementFactory.make(
+                settings.art.get("visualization", "vis")
+            )
         if self.vis_plugin:
-            flags = self.playbin.get_property("flags")
-            flags |= GST_PLAY_FLAG_VIS
-            self.playbin.set_property("flags", flags)
+            # Not enabled until the visualization is shown
             self.playbin.set_property("vis-plugin", self.vis_plugin)
+        self.vis_enabled = False
         bus = self.playbin.get_bus()
         bus.add_signal_watch()
         bus.connect("message", self.on_message)
         self.error = None
         self.current_track = None
+        self.listeners = []
+
+    def make_vis_sink(self):
+        # Visualization frames are limited to vis_fps and scaled to the art
+        # box's size before they reach Python, which then only handles a
+        # few thousand pixels per frame.
+        #
+        # The appsink holds only the newest frame; if the interface falls
+        # behind, older ones are dropped rather than queued.
+        sink = Gst.Bin.new("vis_sink")
+        self.vis_rate = Gst.ElementFactory.make("videorate")
+        self.vis_rate.set_property("drop-only", True)
+        self.vis_rate.set_property("max-rate", settings.art.get("vis_fps"))
+        convert = Gst.ElementFactory.make("videoconvert")
+        scale = Gst.ElementFactory.make("videoscale")
+        scale.set_property("add-borders", False)
+        self.vis_caps = Gst.ElementFactory.make("capsfilter")
+        self.vis_sink = Gst.ElementFactory.make("appsink", "vis_appsink")
+        self.vis_sink.set_property("max-buffers", 1)
+        self.vis_sink.set_property("drop", True)
+        self.vis_sink.set_property("emit-signals", True)
+        self.vis_sink.connect("new-sample", self.on_new_sample)
+        self.vis_pending = False
+        elements = (self.vis_rate, convert, scale, self.vis_caps, self.vis_sink)
+        for element in elements:
+            sink.add(element)
+        for upstream, downstream in zip(elements, elements[1:]):
+            upstream.link(downstream)
+        sink.add_pad(Gst.GhostPad.new("sink", self.vis_rate.get_static_pad("sink")))
+        return sink
+
+    def on_new_sample(self, sink):
+        # Called from the streaming thread. The frame stays in the sink
+        # until the interface pulls it; just let the main loop know.
+        if not self.vis_pending:
+            self.vis_pending = True
+            GLib.idle_add(self.vis_frame_ready)
+        return Gst.FlowReturn.OK
+
+    def vis_frame_ready(self):
+        self.vis_pending = False
+        self.notify("vis")
+        return False
+
+    def make_spectrum(self):
+        # The spectrum visualization analyzes the audio on its way to the
+        # sink, and posts band magnitudes on the bus; no video is involved
+        spectrum = Gst.ElementFactory.make("spectrum", "spectrum")
+        if not spectrum:
+            return None
+        spectrum.set_property("interval", Gst.SECOND // settings.art.get("vis_fps"))
+        spectrum.set_property("threshold", THRESHOLD)
+        spectrum.set_property("post-messages", False)
+        spectrum.set_property("message-magnitude", True)
+        spectrum.set_property("message-phase", False)
+        self.playbin.set_property("audio-filter", spectrum)
+        return spectrum
+
+    def set_vis_flag(self, enabled):
+        flags = self.playbin.get_property("flags")
+        if enabled:
+            flags |= GST_PLAY_FLAG_VIS
+        else:
+            flags &= ~GST_PLAY_FLAG_VIS
+        self.playbin.set_property("flags", flags)
+
+    def set_vis_enabled(self, enabled):
+        # playbin adds and removes the vis branch on the fly, without
+        # interrupting the audio. The spectrum element stays in place,
+        # but only posts messages while shown.
+        self.vis_enabled = enabled
+        if self.vis_plugin:
+            self.set_vis_flag(enabled)
+        if self.spectrum:
+            self.spectrum.set_property("post-messages", enabled)
+            self.magnitudes = None
+
+    def set_vis_rate(self, fps):
+        self.vis_rate.set_property("max-rate", fps)
+        if self.spectrum:
+            self.spectrum.set_property("interval", Gst.SECOND // fps)
+
+    def set_vis_size(self, width, height):
+        if self.spectrum:
+            self.spectrum.set_property("bands", width * BANDS_PER_COLUMN)
+        # Changing the caps renegotiates the running pipeline
+        caps = Gst.Caps.from_string(
+            f"video/x-raw,format=RGB,width={width},height={height},"
+            "pixel-aspect-ratio=1/1"
+        )
+        self.vis_caps.set_property("caps", caps)
+
+    def add_listener(self, callback):
+        # callback(reason) runs on the main loop whenever something shown
+        # changes: "track", "tags", "state", "seek" or "vis" (a new
+        # visualization frame)
+        self.listeners.append(callback)
+
+    def notify(self, reason):
+        for callback in self.listeners:
+            callback(reason)
 
     def set_playlist(self, playlist):
         self.playlist = playlist
@@ -55,6 +162,7 @@ class Player:
         else:
             self.playbin.set_property("uri", Gst.filename_to_uri(entry.url))
         self.play()
+        self.notify("track")
 
     def play(self):
         self.playbin.set_state(Gst.State.PLAYING)
@@ -62,18 +170,21 @@ class Player:
     def pause(self):
         self.playbin.set_state(Gst.State.PAUSED)
 
+    def is_playing(self):
+        return self.playbin.current_state == Gst.State.PLAYING
+
     def play_pause(self):
         if self.playbin.current_state == Gst.State.PAUSED:
             self.play()
         else:
             self.pause()
 
-    def seek_forward(self):
-        (set, track_pos) = self.playbin.query_position(Gst.Format.TIME)
-        new_pos = track_pos + 10 * Gst.SECOND
-        flags = self.playbin.get_property("flags")
-        flags ^= GST_PLAY_FLAG_VIS
-        self.playbin.set_property("flags", flags)
+    def seek_to(self, new_pos):
+        # Seeking with the vis branch running can stall, so it is taken
+        # out for the duration of the seek, if it is in at all
+        vis = self.vis_enabled and self.vis_plugin
+        if vis:
+            self.set_vis_flag(False)
         self.playbin.seek(
             1.0,
             Gst.Format.TIME,
@@ -84,31 +195,17 @@ class Player:
             0,
         )
         self.playbin.get_state(Gst.CLOCK_TIME_NONE)
-        flags = self.playbin.get_property("flags")
-        flags |= GST_PLAY_FLAG_VIS
-        self.playbin.set_property("flags", flags)
+        if vis:
+            self.set_vis_flag(True)
+        self.notify("seek")
+
+    def seek_forward(self):
+        (set, track_pos) = self.playbin.query_position(Gst.Format.TIME)
+        self.seek_to(track_pos + 10 * Gst.SECOND)
 
     def seek_reverse(self):
         (set, track_pos) = self.playbin.query_position(Gst.Format.TIME)
-        new_pos = track_pos - 10 * Gst.SECOND
-        if new_pos < 0:
-            new_pos = 0
-        flags = self.playbin.get_property("flags")
-        flags ^= GST_PLAY_FLAG_VIS
-        self.playbin.set_property("flags", flags)
-        self.playbin.seek(
-            1.0,
-            Gst.Format.TIME,
-            Gst.SeekFlags.FLUSH,
-            Gst.SeekType.SET,
-            new_pos,
-            Gst.SeekType.NONE,
-            0,
-        )
-        self.playbin.get_state(Gst.CLOCK_TIME_NONE)
-        flags = self.playbin.get_property("flags")
-        flags |= GST_PLAY_FLAG_VIS
-        self.playbin.set_property("flags", flags)
+        self.seek_to(max(track_pos - 10 * Gst.SECOND, 0))
 
     def get_current_track(self):
         return self.current_track
@@ -135,6 +232,7 @@ class Player:
             volume = 1.0
         self.playbin.set_property("volume", volume)
         self.playbin.set_property("mute", 0)
+        self.notify("state")
 
     def lower_volume(self):
         volume = self.playbin.get_property("volume")
@@ -143,16 +241,52 @@ class Player:
             volume = 0.0
         self.playbin.set_property("volume", volume)
         self.playbin.set_property("mute", 0)
+        self.notify("state")
 
     def mute_or_unmute(self):
         mute = self.playbin.get_property("mute")
         self.playbin.set_property("mute", not mute)
+        self.notify("state")
 
     def vis_available(self):
-        return bool(self.vis_plugin)
-
-    def get_vis_frame(self):
-        return image_from_pixbuf(self.pixbuf_sink.get_property("last-pixbuf"))
+        return bool(self.vis_plugin or self.spectrum)
+
+    def uses_spectrum(self):
+        return bool(self.spectrum)
+
+    def get_magnitudes(self):
+        # Band magnitudes in dB from the spectrum visualization, or None
+        return self.magnitudes
+
+    @contextmanager
+    def vis_frame(self, repeat=False):
+        # The newest visualization frame, or None if there is no new one
+        # (unless repeat is set). The frame is copied into the image, and
+        # the buffer unmapped, before the block runs.
+        #
+        # The appsink's action signal, rather than its method, works
+        # without the GstApp typelib.
+        sample = self.vis_sink.emit("try-pull-sample", 0)
+        if not sample and repeat:
+            sample = self.vis_sink.get_property("last-sample")
+        if not sample:
+            yield None
+            return
+        buffer = sample.get_buffer()
+        (mapped, mapping) = buffer.map(Gst.MapFlags.READ)
+        if not mapped:
+            yield None
+            return
+        structure = sample.get_caps().get_structure(0)
+        try:
+            image = image_from_frame(
+                mapping.data,
+                structure.get_value("width"),
+                structure.get_value("height"),
+            )
+        finally:
+            buffer.unmap(mapping)
+        yield image
 
     def get_status(self):
         if not self.current_track:
@@ -196,6 +330,7 @@ class Player:
         self.current_track = None
         if error:
             self.error = error
+        self.notify("track")
 
     def parse_tags(self, taglist, tagtype):
         match tagtype:
@@ -234,6 +369,15 @@ class Player:
         elif t == Gst.MessageType.TAG:
             taglist = message.parse_tag()
             taglist.foreach(self.parse_tags)
+            self.notify("tags")
+        elif t == Gst.MessageType.STATE_CHANGED:
+            if message.src == self.playbin:
+                self.notify("state")
+        elif t == Gst.MessageType.ELEMENT:
+            if self.spectrum and message.src == self.spectrum:
+                structure = message.get_structure()
+                self.magnitudes = parse_magnitudes(structure.to_string())
+                self.notify("vis")
         elif t == Gst.MessageType.ERROR:
             self.playbin.set_state(Gst.State.NULL)
             err, _ = message.parse_error()
@@ -11,6 +11,7 @@ from threading import Thread
 
 from urllib3.util import parse_url
 
+from tuatara.art_cache import art_cache
 from tuatara.cover_art import FileCoverArt
 from tuatara.cover_art_fetcher import fetchers
 from tuatara.sanitize import sanitize_artist, sanitize_album
@@ -45,73 +46,98 @@ class PlaylistEntry:
         else:
             self.url = url
 
-    def find_cover_art(self):
-        def fetch(fetchers, cached_art_path):
-            for name, fetcher in fetchers:
-                art_url = fetcher.fetch(self)
-                if not art_url:
-                    continue
-
-                art = fetcher.download(art_url, cached_art_path)
-                if not art:
-                    continue
-                self.cover_art = art
-                self.fetch_status = "success"
-                debug(f"Using downloaded {name} art for {self}")
-                return
-            self.fetch_status = "failed"
+    def is_local(self):
+        return parse_url(self.url).scheme is None
+
+    def directory_art_path(self):
+        directory = os.path.dirname(self.url)
+        with os.scandir(directory) as direntries:
+            for entry in direntries:
+                if entry.is_file() and (
+                    entry.name == "cover.jpg" or entry.name == "cover.png"
+                ):
+                    filepath = os.path.join(directory, entry.name)
+                    if not os.access(filepath, os.R_OK):
+                        debug(
+                            f"Cannot read in-directory art file {filepath} for {self}"
+                        )
+                        continue
+                    return filepath
+        return None
+
+    def cache_name(self):
+        s_artist = sanitize_artist(self.artist)
+        s_album = sanitize_album(self.album)
+        return f"{s_artist}-{s_album}.art"
 
+    def cached_art_path(self):
+        return os.path.join(cache_dir(), self.cache_name())
+
+    def fetch_cover_art(self, fetchers, cached_art_path, on_found=None):
+        for name, fetcher in fetchers:
+            art_url = fetcher.fetch(self)
+            if not art_url:
+                continue
+
+            art = fetcher.download(art_url, cached_art_path)
+            if not art:
+                continue
+            # With cache_pack, the downloaded file is packed and removed
+            cache_name = os.path.basename(cached_art_path)
+            art_cache.add(cache_name)
+            self.cover_art = art_cache.lookup(cache_name) or art
+            self.fetch_status = "success"
+            debug(f"Using downloaded {name} art for {self}")
+            if on_found:
+                on_found()
+            return
+        self.fetch_status = "failed"
+
+    def find_cover_art(self, on_found=None):
+        # on_found() is called from the fetch thread if art is downloaded
         if self.cover_art:
             return
 
-        parsed_url = parse_url(self.url)
         # Check directory
-        if parsed_url.scheme is None:
-            directory = os.path.dirname(self.url)
-            with os.scandir(directory) as direntries:
-                for entry in direntries:
-                    if entry.is_file() and (
-                        entry.name == "cover.jpg" or entry.name == "cover.png"
-                    ):
-                        filepath = os.path.join(directory, entry.name)
-                        if not os.access(filepath, os.R_OK):
-                            debug(
-                                f"Cannot read in-directory art file {filepath} for {self}"
-                            )
-                            continue
-                        debug(f"Using in-directory {entry.name} for {self}")
-                        self.cover_art = FileCoverArt(
-                            os.path.join(directory, entry.name)
-                        )
-                        return
+        if self.is_local():
+            filepath = self.directory_art_path()
+            if filepath:
+                debug(f"Using in-directory {os.path.basename(filepath)} for {self}")
+                self.cover_art = FileCoverArt(filepath)
+                return
 
         if not self.album or not self.artist:
             self.fetch_status = "failed"
             return
 
         # Check cache
-        s_artist = sanitize_artist(self.artist)
-        s_album = sanitize_album(self.album)
-        fname = f"{s_artist}-{s_album}.art"
-        cached_art_path = os.path.join(cache_dir(), fname)
-        if os.path.exists(cached_art_path):
-            debug(f"Using cached {cached_art_path} for {self}")
-            self.cover_art = FileCoverArt(cached_art_path)
+        cached_art = art_cache.lookup(self.cache_name())
+        if cached_art:
+            debug(f"Using cached {cached_art.path} for {self}")
+            self.cover_art = cached_art
             return
+        cached_art_path = self.cached_art_path()
 
         # Try to download
-        configured_fetchers = []
-        for name in settings.get_art().get("fetchers"):
-            fetcher = fetchers.get(name)
-            if not fetcher:
-                debug(f"No fetcher named {name}")
-                continue
-            configured_fetchers.append((name, fetcher))
-
-        if configured_fetchers:
+        fetchers = configured_fetchers()
+        if fetchers:
             self.fetch_status = "fetching"
 
-            Thread(target=fetch, args=[configured_fetchers, cached_art_path]).start()
+            Thread(
+                target=self.fetch_cover_art, args=[fetchers, cached_art_path, on_found]
+            ).start()
         else:
-            debug("No configured fetchers")
             self.fetch_status = "failed"
+
+
+def configured_fetchers():
+    configured = []
+    for name in settings.get_art().get("fetchers"):
+        fetcher = fetchers.get(name)
+        if not fetcher:
+            debug(f"No fetcher named {name}")
+            continue
+        configured.append((name, fetcher))
+    if not configured:
+        debug("No configured fetchers")
+    return configured
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+#
+# SPDX-FileCopyrightText: Copyright © 2023 Bill Nottingham <notting@splat.cc>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import re
+
+from PIL import Image
+
+from tuatara.image_utils import get_palette
+
+RAMP = " .'`^\",:;Il!i><~+_-?][}{1)(|\\/tfjrxnuvczXYUJCLQ0OZmwqpdbkhao*#MW&8%B@$"
+
+# Half-block mode draws two pixels per cell: the top one in this glyph's
+# foreground color, and the bottom one in the background color
+HALF_BLOCK = "▀"
+
+# Unchanged cells between two changed runs are cheaper to rewrite than to
+# skip with another cursor move, up to about this many.
+RUN_GAP = 4
+
+# Runs of identical blank cells at least this long are erased in place
+# (ECH) and skipped over (CUF), rather than written out as spaces.
+BLANK_RUN = 12
+BLANKS = re.compile(f" {{{BLANK_RUN},}}")
+
+# Bits per channel kept when looking up the nearest terminal color
+LUT_BITS = 5
+
+# Distinct colors remembered by the renderer before it starts over
+ESCAPE_LIMIT = 65536
+
+
+def ramp_table(ramp):
+    # Translation table from gray level to ramp character
+    return bytes(
+        ord(ramp[int((level / 255) * (len(ramp) - 1))]) for level in range(256)
+    )
+
+
+class ColorTable:
+    # Maps an RGB color to the escape sequence for the nearest color the
+    # terminal can show, as foreground or background.
+    #
+    # For 256 colors and fewer, every color (at LUT_BITS per channel) is
+    # matched to the palette once, up front, by Pillow; lookups are then
+    # just indexing. Truecolor needs no matching at all.
+    def __init__(self, term, background=False, colors=None):
+        self.term = term
+        self.background = background
+        self.colors = colors or term.number_of_colors
+        self.table = None
+        if self.colors < 1 << 24:
+            self.table = self.build()
+
+    def build(self):
+        shift = 8 - LUT_BITS
+        levels = 1 << LUT_BITS
+        # The middle of each bucket of colors
+        centers = bytes([(x << shift) | (1 << (shift - 1)) for x in range(levels)])
+        data = bytes(
+            [c for r in centers for g in centers for b in centers for c in (r, g, b)]
+        )
+        if not self.colors:
+            return [""] * len(data)
+        colors = min(self.colors, 256)
+        image = Image.frombytes("RGB", (levels**3, 1), data)
+        indices = image.quantize(
+            colors, palette=get_palette(colors), dither=Image.Dither.NONE
+        ).tobytes()
+        escape = self.term.on_color if self.background else self.term.color
+        # Anything past the palette is padding, which is black
+        escapes = [escape(x if x < colors else 0) for x in range(256)]
+        return [escapes[x] for x in indices]
+
+    def __call__(self, rgb):
+        (r, g, b) = rgb[:3]
+        if self.table is None:
+            if self.background:
+                return self.term.on_color_rgb(r, g, b)
+            return self.term.color_rgb(r, g, b)
+        shift = 8 - LUT_BITS
+        return self.table[
+            ((r >> shift) << (2 * LUT_BITS)) | ((g >> shift) << LUT_BITS) | (b >> shift)
+        ]
+
+
+class ArtRenderer:
+    # Turns a downconverted image into terminal output for the art box.
+    #
+    # Works on the whole image at once: pixel data comes from tobytes(),
+    # characters and color escapes come from lookup tables, and each row
+    # is built with a single join.
+    #
+    # A color escape is only written when the color changes along a row,
+    # and long runs of identical blank cells are erased rather than
+    # written, where the terminal supports it.
+    #
+    # The previous frame's cells are kept, so that only cells that changed
+    # are written. A full repaint happens on the first frame, when the box
+    # or base color changes, or after invalidate().
+    def __init__(self, term):
+        self.term = term
+        self.colorfunc = None
+        self.escapes = {}
+        self.canonical = {}
+        self.ramps = {}
+        self.previous = None
+        self.geometry = None
+        self.frame_bytes = 0
+        self.moves = {}
+        self.blanks = {}
+        self.can_erase = bool(term.ech) and bool(term.cuf)
+        self.half_funcs = None
+        self.half_func = None
+
+    def invalidate(self):
+        # The screen was cleared or drawn over
+        self.previous = None
+
+    def escapes_for(self, colorfunc, pixels):
+        if colorfunc != self.colorfunc:
+            self.colorfunc = colorfunc
+            self.escapes = {}
+            self.canonical = {}
+        if len(self.escapes) > ESCAPE_LIMIT:
+            # Truecolor visualizations could otherwise grow this forever
+            self.escapes = {}
+            self.canonical = {}
+        escapes = self.escapes
+        for pixel in set(pixels).difference(escapes):
+            # Colors that map to the same escape share one object
+            escape = colorfunc(pixel)
+            escapes[pixel] = self.canonical.setdefault(escape, escape)
+        return escapes
+
+    def move_xy(self, x, y):
+        # blessed's move_xy goes through tparm() every time
+        if (x, y) not in self.moves:
+            self.moves[(x, y)] = self.term.move_xy(x, y)
+        return self.moves[(x, y)]
+
+    def blank(self, count):
+        if count not in self.blanks:
+            self.blanks[count] = self.term.ech(count) + self.term.cuf(count)
+        return self.blanks[count]
+
+    def chars_for(self, ramp):
+        if ramp not in self.ramps:
+            self.ramps[ramp] = ramp_table(ramp)
+        return self.ramps[ramp]
+
+    def render(self, img, box, colorstr, ramp, colorfunc):
+        width = box.width
+        rgb = img if img.mode == "RGB" else img.convert("RGB")
+        data = rgb.tobytes()
+        gray = img.convert("L").tobytes()
+
+        pixels = list(zip(data[0::3], data[1::3], data[2::3]))
+        escapes = self.escapes_for(colorfunc, pixels)
+        escapes = list(map(escapes.__getitem__, pixels))
+        chars = gray.translate(self.chars_for(ramp)).decode("ascii")
+
+        # Each row is its cells' color escapes, and their characters
+        grid = [
+            (escapes[h * width : (h + 1) * width], chars[h * width : (h + 1) * width])
+            for h in range(box.height)
+        ]
+        return self.draw(grid, box, colorstr)
+
+    def pair_colorfunc(self, fgfunc, bgfunc):
+        # One function per pair of color functions, so that escapes_for()
+        # keeps its table between frames. A cell whose two pixels match
+        # is drawn as a space, and only needs the background color.
+        if (fgfunc, bgfunc) != self.half_funcs:
+            self.half_funcs = (fgfunc, bgfunc)
+
+            def half_func(pair):
+                if pair[0] == pair[1]:
+                    return bgfunc(pair[1])
+                return fgfunc(pair[0]) + bgfunc(pair[1])
+
+            self.half_func = half_func
+        return self.half_func
+
+    def render_half(self, img, box, colorstr, fgfunc, bgfunc):
+        # img has two pixel rows for each row of the box
+        width = box.width
+        rgb = img if img.mode == "RGB" else img.convert("RGB")
+        data = rgb.tobytes()
+        pixels = list(zip(data[0::3], data[1::3], data[2::3]))
+
+        rows = [
+            list(
+                zip(
+                    pixels[2 * h * width : (2 * h + 1) * width],
+                    pixels[(2 * h + 1) * width : (2 * h + 2) * width],
+                )
+            )
+            for h in range(box.height)
+        ]
+        escapes = self.escapes_for(
+            self.pair_colorfunc(fgfunc, bgfunc), [x for row in rows for x in row]
+        )
+        grid = [
+            (
+                list(map(escapes.__getitem__, row)),
+                "".join([" " if t == b else HALF_BLOCK for t, b in row]),
+            )
+            for row in rows
+        ]
+        return self.draw(grid, box, colorstr)
+
+    def draw(self, grid, box, colorstr):
+        # grid is a row per line of the box: a list of the cells' color
+        # escapes (from escapes_for()), and a string of their characters
+        geometry = (box.left, box.top, box.width, box.height, colorstr)
+        if self.previous is None or geometry != self.geometry:
+            output = self.repaint(grid, box, colorstr)
+        else:
+            output = self.update(grid, box, colorstr)
+        self.previous = grid
+        self.geometry = geometry
+        self.frame_bytes = len(output.encode("utf-8"))
+        return output
+
+    def repaint(self, grid, box, colorstr):
+        move_xy = self.move_xy
+        normal = self.term.normal
+        rows = []
+        for h, (escapes, chars) in enumerate(grid):
+            rows.append(move_xy(box.left, box.top + h))
+            rows.append(colorstr)
+            rows.append(self.encode(escapes, chars))
+            rows.append(normal)
+        return "".join(rows)
+
+    def update(self, grid, box, colorstr):
+        move_xy = self.move_xy
+        normal = self.term.normal
+        output = []
+        for h, (old, row) in enumerate(zip(self.previous, grid)):
+            if old == row:
+                continue
+            (old_escapes, old_chars) = old
+            (escapes, chars) = row
+            changed = [
+                w
+                for w, e1, e2, c1, c2 in zip(
+                    range(box.width), old_escapes, escapes, old_chars, chars
+                )
+                if e1 is not e2 or c1 != c2
+            ]
+            start = end = changed[0]
+            for w in changed[1:] + [None]:
+                if w is not None and w - end <= RUN_GAP:
+                    end = w
+                    continue
+                output.append(move_xy(box.left + start, box.top + h))
+                output.append(colorstr)
+                output.append(
+                    self.encode(escapes[start : end + 1], chars[start : end + 1])
+                )
+                output.append(normal)
+                if w is not None:
+                    start = end = w
+        return "".join(output)
+
+    def encode(self, escapes, chars):
+        # Escapes come from the table, so equal colors are the same object.
+        # Only write one where it differs from the cell before.
+        previous = [None] + escapes[:-1]
+        output = "".join(
+            [
+                char if escape is before else escape + char
+                for escape, before, char in zip(escapes, previous, chars)
+            ]
+        )
+        if self.can_erase:
+            # Spaces only ever come from cells, and there are no escapes
+            # within a run of them, so they all share one color
+            output = BLANKS.sub(lambda m: self.blank(len(m.group())), output)
+        return output
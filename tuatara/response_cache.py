@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# SPDX-FileCopyrightText: Copyright © 2023 Bill Nottingham <notting@splat.cc>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import hashlib
+import json
+import os
+import time
+
+from tuatara.settings import atomic_write, cache_dir, debug
+
+
+class CachedResponse:
+    def __init__(self, url, data, stored, ttl, etag=None, last_modified=None):
+        self.url = url
+        self.data = data
+        self.stored = stored
+        self.ttl = ttl
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def is_fresh(self):
+        return time.time() < self.stored + self.ttl
+
+    def validators(self):
+        # Headers for a conditional request, so the server can just say 304
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_json(self):
+        return {
+            "url": self.url,
+            "data": self.data,
+            "stored": self.stored,
+            "ttl": self.ttl,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+        }
+
+
+class ResponseCache:
+    # Cached JSON search responses, one file per URL, under cache_dir().
+    # The directory is looked up on every access so that XDG_CACHE_HOME
+    # is honored even if it changes after startup.
+    def path_for(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(cache_dir("responses"), f"{key}.json")
+
+    def get(self, url):
+        path = self.path_for(url)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            debug(f"Ignoring unreadable cached response {path}")
+            return None
+        if entry.get("url") != url:
+            return None
+        return CachedResponse(
+            url,
+            entry.get("data"),
+            entry.get("stored", 0),
+            entry.get("ttl", 0),
+            entry.get("etag"),
+            entry.get("last_modified"),
+        )
+
+    def put(self, entry):
+        # Written atomically, as fetches may run in several threads at once
+        try:
+            with atomic_write(self.path_for(entry.url)) as f:
+                json.dump(entry.to_json(), f)
+        except OSError as e:
+            debug(f"Cannot cache response for {entry.url}: {e}")
+
+    def store(self, url, response, data, ttl):
+        entry = CachedResponse(
+            url,
+            data,
+            time.time(),
+            ttl,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+        self.put(entry)
+        return entry
+
+    def refresh(self, entry, response):
+        # A 304 may carry updated validators
+        entry.stored = time.time()
+        entry.etag = response.headers.get("ETag", entry.etag)
+        entry.last_modified = response.headers.get("Last-Modified", entry.last_modified)
+        self.put(entry)
+        return entry
+
+
+response_cache = ResponseCache()
@@ -7,8 +7,10 @@
 
 import os
 import sys
+import tempfile
 import tomllib
 
+from contextlib import contextmanager
 from datetime import datetime
 
 version = "0.6.2"
@@ -23,10 +25,16 @@ class Settings:
                 "fetchers": ["apple", "musicbrainz"],
                 "dynamic_background": True,
                 "ascii_truecolor": False,
+                "half_block": False,
+                "image_protocol": "auto",
                 "font_ratio": 2.0,
                 "brightness_adj": 0.75,
                 "contrast_adj": 1.25,
                 "visualization": "synaescope",
+                "vis_fps": 30,
+                "throttle": True,
+                "cache_size_limit": 500,
+                "cache_pack": False,
             },
         }
         self._debugobj = None
@@ -51,6 +59,20 @@ class Settings:
         sys.stderr.write("Error: 'ascii_truecolor' must be true or false\n")
         return 1
 
+    def validate_half_block(self, datum):
+        if isinstance(datum, bool):
+            return 0
+        sys.stderr.write("Error: 'half_block' must be true or false\n")
+        return 1
+
+    def validate_image_protocol(self, datum):
+        if datum in ("auto", "kitty", "sixel", "cells"):
+            return 0
+        sys.stderr.write(
+            "Error: 'image_protocol' must be 'auto', 'kitty', 'sixel' or 'cells'\n"
+        )
+        return 1
+
     def validate_font_ratio(self, datum):
         if (isinstance(datum, float) or isinstance(datum, int)) and datum > 0:
             return 0
@@ -63,6 +85,18 @@ class Settings:
         sys.stderr.write("Error: 'visualization' must be a string\n")
         return 1
 
+    def validate_vis_fps(self, datum):
+        if isinstance(datum, int) and not isinstance(datum, bool) and 1 <= datum <= 60:
+            return 0
+        sys.stderr.write("Error: 'vis_fps' must be a whole number from 1 to 60\n")
+        return 1
+
+    def validate_throttle(self, datum):
+        if isinstance(datum, bool):
+            return 0
+        sys.stderr.write("Error: 'throttle' must be true or false\n")
+        return 1
+
     def validate_brightness_adj(self, datum):
         if isinstance(datum, float) and datum >= 0 and datum <= 2:
             return 0
@@ -75,6 +109,18 @@ class Settings:
         sys.stderr.write("Error: 'contrast_adj' must be between 0 and 2\n")
         return 1
 
+    def validate_cache_size_limit(self, datum):
+        if isinstance(datum, int) and not isinstance(datum, bool) and datum >= 0:
+            return 0
+        sys.stderr.write("Error: 'cache_size_limit' must be a whole number of MiB\n")
+        return 1
+
+    def validate_cache_pack(self, datum):
+        if isinstance(datum, bool):
+            return 0
+        sys.stderr.write("Error: 'cache_pack' must be true or false\n")
+        return 1
+
     def validate_art_settings(self, data):
         errors = 0
         for item in data.keys():
@@ -136,9 +182,29 @@ def config_dir():
     return os.getenv("XDG_CONFIG_HOME") or os.path.join(os.getenv("HOME"), ".config")
 
 
-def cache_dir():
+def cache_dir(kind="artwork"):
     prefix = os.getenv("XDG_CACHE_HOME") or os.path.join(os.getenv("HOME"), ".cache")
-    return os.path.join(prefix, "tuatara", "artwork")
+    return os.path.join(prefix, "tuatara", kind)
+
+
+@contextmanager
+def atomic_write(path, mode="w"):
+    # Write to a temporary file next to path and rename it into place, so
+    # that readers (other threads, other instances) never see a partial
+    # file. Raises OSError.
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o755, exist_ok=True)
+    fd, tmppath = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmppath, path)
+    except BaseException:
+        try:
+            os.unlink(tmppath)
+        except OSError:
+            pass
+        raise
 
 
 def debug(message):
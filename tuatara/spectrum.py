@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+#
+# SPDX-FileCopyrightText: Copyright © 2023 Bill Nottingham <notting@splat.cc>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import re
+
+# Eighths of a cell, from the bottom up
+GLYPHS = "▁▂▃▄▅▆▇█"
+
+# Quietest level shown, in dB. Also the spectrum element's threshold.
+THRESHOLD = -70
+
+# Frequency bands analyzed for each column of bars
+BANDS_PER_COLUMN = 4
+
+MAGNITUDES = re.compile(r"magnitude=\(float\)\{([^}]*)\}")
+
+
+def parse_magnitudes(text):
+    # The magnitudes from a spectrum element message, as a string. The
+    # list is not readable through the structure's API from Python.
+    match = MAGNITUDES.search(text)
+    if not match:
+        return None
+    return [float(x) for x in match.group(1).split(",")]
+
+
+def columns(magnitudes, width):
+    # Spread the (linearly spaced) bands over the columns on a roughly
+    # logarithmic scale, so that the bass does not get squeezed into
+    # the first few columns. Each column shows its loudest band.
+    bands = len(magnitudes)
+    if bands <= width:
+        return magnitudes + [THRESHOLD] * (width - bands)
+    edges = [
+        k + int((bands - width) * (bands ** (k / width) - 1) / (bands - 1))
+        for k in range(width + 1)
+    ]
+    return [max(magnitudes[edges[k] : edges[k + 1]]) for k in range(width)]
+
+
+def bar_rows(levels, height):
+    # Rows of bar glyphs, top row first, for levels in dB
+    eighths = [
+        round(min(max((x - THRESHOLD) / -THRESHOLD, 0), 1) * height * 8) for x in levels
+    ]
+    rows = []
+    for h in range(height):
+        bottom = (height - 1 - h) * 8
+        rows.append(
+            "".join(
+                [
+                    " " if x <= bottom else GLYPHS[min(x - bottom, 8) - 1]
+                    for x in eighths
+                ]
+            )
+        )
+    return rows
+
+
+def bar_colors(height):
+    # Green at the bottom, through yellow, to red at the top
+    colors = []
+    for h in range(height):
+        level = (height - 1 - h) / max(height - 1, 1)
+        if level < 0.5:
+            colors.append((int(510 * level), 200, 0))
+        else:
+            colors.append((255, int(200 * (2 - 2 * level)), 0))
+    return colors
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# SPDX-FileCopyrightText: Copyright © 2023 Bill Nottingham <notting@splat.cc>
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import time
+
+# Levels of detail for the visualization, from full down: a name for the
+# status line, what vis_fps is divided by, the most colors used, and how
+# many pixels across and down each pixel drawn stands for
+LEVELS = (
+    ("full", 1, 1 << 24, 1),
+    ("low rate", 2, 1 << 24, 1),
+    ("low color", 2, 256, 1),
+    ("low resolution", 4, 256, 2),
+)
+
+# A frame is backed up if writing it blocked for more than this share of
+# the frame interval, or if more than this many bytes are still queued
+# for the terminal once it has been written
+WRITE_SHARE = 0.5
+PENDING_LIMIT = 16384
+
+# Frames backed up in a row before dropping a level
+BACKED_UP_FRAMES = 3
+
+# Seconds without a backed up frame before going back up a level
+RECOVER_TIME = 5.0
+
+
+class Throttle:
+    # Picks the level of detail that keeps the visualization real-time.
+    # Over ssh or in a slow terminal, frames written faster than they
+    # can be shown queue up, and everything on screen lags behind the
+    # audio and the keyboard.
+    #
+    # Levels that would draw no differently in a terminal with term_colors
+    # colors, such as "low color" in a 256-color terminal, are skipped.
+    def __init__(self, enabled=True, term_colors=1 << 24):
+        self.enabled = enabled
+        self.term_colors = term_colors
+        self.level = 0
+        self.backed_up = 0
+        self.calm_since = time.monotonic()
+
+    @property
+    def name(self):
+        return LEVELS[self.level][0]
+
+    @property
+    def divisor(self):
+        return LEVELS[self.level][1]
+
+    @property
+    def colors(self):
+        return LEVELS[self.level][2]
+
+    @property
+    def scale(self):
+        return LEVELS[self.level][3]
+
+    def effect(self, level):
+        (name, divisor, colors, scale) = LEVELS[level]
+        return (divisor, min(colors, self.term_colors), scale)
+
+    def update(self, write_time, pending, interval):
+        # After a frame is written. Returns whether the level changed.
+        if not self.enabled:
+            return False
+        now = time.monotonic()
+        if write_time > interval * WRITE_SHARE or pending > PENDING_LIMIT:
+            self.calm_since = now
+            self.backed_up += 1
+            if self.backed_up >= BACKED_UP_FRAMES and self.level < len(LEVELS) - 1:
+                level = self.level + 1
+                while level < len(LEVELS) - 1 and self.effect(level) == self.effect(
+                    self.level
+                ):
+                    level += 1
+                self.level = level
+                self.backed_up = 0
+                return True
+        else:
+            self.backed_up = 0
+            if self.level and now - self.calm_since >= RECOVER_TIME:
+                level = self.level - 1
+                while level and self.effect(level) == self.effect(level - 1):
+                    level -= 1
+                self.level = level
+                self.calm_since = now
+                return True
+        return False